@@ -1,8 +1,11 @@
 from fastapi import FastAPI, Depends, HTTPException
-from pgdn_ws import notification_manager, create_websocket_router, notify
+from pgdn_ws import notification_manager, create_websocket_router, cached_auth_handler, notify
+from pgdn_ws._cache import TTLCache
 from typing import Dict, Any, Optional
 import jwt
 import asyncio
+import secrets
+import time
 from datetime import datetime, timedelta
 
 app = FastAPI()
@@ -11,21 +14,50 @@ app = FastAPI()
 SECRET_KEY = "your-secret-key-here"
 ALGORITHM = "HS256"
 
+# One PyJWT instance, bytes key and algorithm list, built once and shared
+# by signing and verification instead of per call
+_jwt = jwt.PyJWT()
+_jwt_key = SECRET_KEY.encode()
+_JWT_ALGORITHMS = [ALGORITHM]
+
 # JWT auth handler
 async def jwt_auth_handler(token: str) -> Optional[Dict[str, Any]]:
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = _jwt.decode(token, _jwt_key, algorithms=_JWT_ALGORITHMS)
         user_id = payload.get("sub")
         if user_id:
             return {
                 "user_id": user_id,
                 "groups": payload.get("groups", ["users"]),
-                "email": payload.get("email")
+                "email": payload.get("email"),
+                # Lets cached_auth_handler drop the entry when the token expires
+                "exp": payload.get("exp")
             }
     except jwt.InvalidTokenError:
         pass
     return None
 
+# Reconnects and extra tabs reuse the same token, so skip the HMAC + JSON
+# decode for tokens seen within the last 30 seconds
+auth_handler = cached_auth_handler(jwt_auth_handler, ttl=30)
+
+# Issued tokens: (sub, email, exp // 30s) -> token
+# Repeated logins by the same user within a 30s window reuse the token
+# instead of signing a new one.
+_token_cache = TTLCache(maxsize=1000)
+
+def issue_token(token_data: Dict[str, Any]) -> str:
+    key = (
+        token_data["sub"],
+        token_data["email"],
+        int(token_data["exp"].timestamp()) // 30
+    )
+    token = _token_cache.get(key)
+    if token is None:
+        token = _jwt.encode(token_data, _jwt_key, algorithm=ALGORITHM)
+        _token_cache.set(key, token, ttl=30)
+    return token
+
 # Register custom message handlers
 async def handle_subscribe(message: dict, user_id: str):
     """Handle node subscription requests"""
@@ -48,7 +80,7 @@ notification_manager.register_handler("subscribe", handle_subscribe)
 
 # Add WebSocket with JWT auth
 app.include_router(
-    create_websocket_router(auth_handler=jwt_auth_handler),
+    create_websocket_router(auth_handler=auth_handler),
     prefix="/api"
 )
 
@@ -63,7 +95,7 @@ async def login(email: str, password: str):
             "groups": ["users", "admins"] if email.endswith("@admin.com") else ["users"],
             "exp": datetime.utcnow() + timedelta(hours=24)
         }
-        token = jwt.encode(token_data, SECRET_KEY, algorithm=ALGORITHM)
+        token = issue_token(token_data)
         return {"access_token": token, "token_type": "bearer"}
 
     raise HTTPException(status_code=401, detail="Invalid credentials")
@@ -71,7 +103,7 @@ async def login(email: str, password: str):
 # Protected endpoint that sends notifications
 @app.post("/api/nodes/{node_id}/scan")
 async def start_node_scan(node_id: str, user_id: str = "user-123"):  # Get from JWT in real app
-    scan_id = f"scan-{datetime.utcnow().timestamp()}"
+    scan_id = f"scan-{time.time_ns()}-{secrets.token_hex(4)}"
 
     # Notify user scan started
     await notify.notify_user(
@@ -136,4 +168,8 @@ async def start_node_scan(node_id: str, user_id: str = "user-123"):  # Get from
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # uvloop + httptools: install with pip install 'pgdn-ws[speedups]'
+    uvicorn.run(
+        app, host="0.0.0.0", port=8000,
+        loop="uvloop", http="httptools", ws="websockets"
+    )
@@ -2,15 +2,31 @@ from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from pgdn_ws import create_websocket_router, notify, notification_manager
 from typing import Dict, Any, Optional
-from datetime import datetime
+from datetime import datetime, UTC
 from pydantic import BaseModel
 import asyncio
 import logging
+import secrets
+import time
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# (millisecond, formatted timestamp) of the last _now_iso() call
+_last_timestamp = (None, "")
+
+def _now_iso() -> str:
+    """Current UTC time as ISO 8601, formatted at most once per millisecond"""
+    global _last_timestamp
+    ms = time.time_ns() // 1_000_000
+    last = _last_timestamp
+    if ms == last[0]:
+        return last[1]
+    iso = datetime.fromtimestamp(ms / 1000, UTC).isoformat(timespec="milliseconds")
+    _last_timestamp = (ms, iso)
+    return iso
+
 app = FastAPI(title="pgdn-notify Demo")
 
 # Configure CORS
@@ -65,7 +81,7 @@ async def send_notification(user_id: str, request: NotificationRequest):
             message_type="info",
             payload={
                 "message": request.message,
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": _now_iso()
             }
         )
         logger.info(f"Notification sent successfully to {user_id}")
@@ -84,7 +100,7 @@ async def broadcast_message(request: BroadcastRequest):
         payload={
             "message": request.message,
             "from": "system",
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": _now_iso()
         }
     )
     return {"status": "broadcasted", "message": request.message}
@@ -103,7 +119,7 @@ class TaskRequest(BaseModel):
 @app.post("/api/tasks/start")
 async def start_task(request: TaskRequest):
     """Start a task that sends progress updates"""
-    task_id = f"task-{int(datetime.utcnow().timestamp())}"
+    task_id = f"task-{time.time_ns()}-{secrets.token_hex(4)}"
     logger.info(f"Starting task {task_id} for user {request.user_id}")
     
     async def run_task():
@@ -147,4 +163,8 @@ async def get_connections():
 if __name__ == "__main__":
     import uvicorn
     logger.info("Starting pgdn-notify demo server...")
-    uvicorn.run(app, host="0.0.0.0", port=8000, log_level="info")
+    # uvloop + httptools: install with pip install 'pgdn-ws[speedups]'
+    uvicorn.run(
+        app, host="0.0.0.0", port=8000, log_level="info",
+        loop="uvloop", http="httptools", ws="websockets"
+    )
@@ -6,13 +6,28 @@ from fastapi import FastAPI, HTTPException
 from pgdn_ws import create_websocket_router, notify, NotificationMessage
 from celery import Celery
 from typing import Dict, Any, Optional
-from datetime import datetime
+from datetime import datetime, UTC
 import logging
+import time
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# (millisecond, formatted timestamp) of the last _now_iso() call
+_last_timestamp = (None, "")
+
+def _now_iso() -> str:
+    """Current UTC time as ISO 8601, formatted at most once per millisecond"""
+    global _last_timestamp
+    ms = time.time_ns() // 1_000_000
+    last = _last_timestamp
+    if ms == last[0]:
+        return last[1]
+    iso = datetime.fromtimestamp(ms / 1000, UTC).isoformat(timespec="milliseconds")
+    _last_timestamp = (ms, iso)
+    return iso
+
 # FastAPI app
 app = FastAPI(title="pgdn-ws Celery Example")
 
@@ -82,9 +97,47 @@ def broadcast_message_task(message_type: str, payload: Dict[str, Any], exclude_u
         logger.error(f"Failed to broadcast message: {e}")
         return {"success": False, "error": str(e)}
 
+@celery_app.task
+def send_progress(user_id: str, task_name: str, progress: int):
+    """Send a single progress update"""
+    notify.notify_user_sync(
+        user_id=user_id,
+        message_type="task_progress",
+        payload={
+            "task_name": task_name,
+            "progress": progress,
+            "status": "running",
+            "timestamp": _now_iso()
+        }
+    )
+
+@celery_app.task
+def send_task_completed(user_id: str, task_name: str):
+    """Send the completion notification"""
+    notify.notify_user_sync(
+        user_id=user_id,
+        message_type="task_completed",
+        payload={
+            "task_name": task_name,
+            "progress": 100,
+            "status": "completed",
+            "result": "Task completed successfully",
+            "timestamp": _now_iso()
+        }
+    )
+
+# Seconds between progress updates
+PROGRESS_INTERVAL = 2
+
 @celery_app.task
 def process_long_running_task(user_id: str, task_name: str, parameters: Optional[Dict[str, Any]] = None):
-    """Example of a long-running task that sends progress updates"""
+    """
+    Example of a long-running task that sends progress updates
+
+    Progress updates are scheduled as separate tasks with a countdown rather
+    than sent from a sleep loop, so this worker is freed immediately instead
+    of being held for the whole run.
+    """
     try:
         # Send initial notification
         notify.notify_user_sync(
@@ -95,37 +148,22 @@ def process_long_running_task(user_id: str, task_name: str, parameters: Optional
                 "parameters": parameters,
                 "progress": 0,
                 "status": "started",
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": _now_iso()
             }
         )
         
-        # Simulate work with progress updates
-        import time
-        for progress in range(10, 101, 10):
-            time.sleep(2)  # Simulate work
-            
-            notify.notify_user_sync(
-                user_id=user_id,
-                message_type="task_progress",
-                payload={
-                    "task_name": task_name,
-                    "progress": progress,
-                    "status": "running",
-                    "timestamp": datetime.utcnow().isoformat()
-                }
+        # Schedule progress updates at the same cadence as the work
+        steps = range(10, 101, 10)
+        for i, progress in enumerate(steps, start=1):
+            send_progress.apply_async(
+                args=[user_id, task_name, progress],
+                countdown=i * PROGRESS_INTERVAL
             )
         
-        # Send completion notification
-        notify.notify_user_sync(
-            user_id=user_id,
-            message_type="task_completed",
-            payload={
-                "task_name": task_name,
-                "progress": 100,
-                "status": "completed",
-                "result": "Task completed successfully",
-                "timestamp": datetime.utcnow().isoformat()
-            }
+        # Schedule completion notification after the last update
+        send_task_completed.apply_async(
+            args=[user_id, task_name],
+            countdown=(len(steps) + 1) * PROGRESS_INTERVAL
         )
         
         return {"success": True, "task_name": task_name, "user_id": user_id}
@@ -139,7 +177,7 @@ def process_long_running_task(user_id: str, task_name: str, parameters: Optional
                 "task_name": task_name,
                 "error": str(e),
                 "status": "failed",
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": _now_iso()
             }
         )
         logger.error(f"Task failed: {e}")
@@ -233,4 +271,8 @@ async def send_immediate_broadcast(request: BroadcastRequest):
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
+    # uvloop + httptools: install with pip install 'pgdn-ws[speedups]'
+    uvicorn.run(
+        app, host="0.0.0.0", port=8000,
+        loop="uvloop", http="httptools", ws="websockets"
+    ) 
\ No newline at end of file
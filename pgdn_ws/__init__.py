@@ -1,8 +1,8 @@
 from .manager import NotificationManager, notification_manager
 from .router import create_websocket_router
 from .client import NotificationClient, notify
-from .types import NotificationMessage, MessageType
-from .auth import default_auth_handler
+from .types import NotificationMessage, MessageType, UserInfo, freeze_now
+from .auth import default_auth_handler, cached_auth_handler
 
 __version__ = "0.3.0"
 
@@ -14,5 +14,8 @@ __all__ = [
     "notify",
     "NotificationMessage",
     "MessageType",
+    "UserInfo",
+    "freeze_now",
     "default_auth_handler",
+    "cached_auth_handler",
 ]
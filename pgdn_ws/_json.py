@@ -0,0 +1,46 @@
+# pgdn_ws/_json.py
+"""
+JSON helpers for wire frames that use orjson when it is installed and fall
+back to the stdlib json module otherwise. Both paths produce compact output
+and encode datetimes as ISO 8601 strings. Human-facing output (the CLI)
+uses plain json.dumps instead.
+"""
+
+import json
+from datetime import date, datetime
+from typing import Any, Union
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so this catches both
+JSONDecodeError = json.JSONDecodeError
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if ORJSON_AVAILABLE:
+    _OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj: Any) -> str:
+        """Serialize obj to a compact JSON string"""
+        return orjson.dumps(obj, option=_OPTIONS).decode()
+
+    def loads(data: Union[str, bytes]) -> Any:
+        """Parse a JSON document from str or bytes"""
+        return orjson.loads(data)
+else:
+    def dumps(obj: Any) -> str:
+        """Serialize obj to a compact JSON string"""
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=_default)
+
+    def loads(data: Union[str, bytes]) -> Any:
+        """Parse a JSON document from str or bytes"""
+        return json.loads(data)
@@ -0,0 +1,67 @@
+# pgdn_ws/_pool.py
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional
+from .types import NotificationMessage, _now
+
+
+class MessagePool:
+    """
+    Per-thread free list of NotificationMessage shells
+
+    Fields are written straight into the instance ``__dict__``, skipping
+    Pydantic validation; only ``type`` and ``payload`` get a cheap
+    isinstance check (TypeError), the same whether or not a shell was
+    reused. Use this for messages built from already typed values whose
+    lifetime ends when they have been encoded. Call ``release`` once the
+    message is no longer referenced.
+    """
+
+    _FIELDS = frozenset(NotificationMessage.model_fields)
+
+    def __init__(self, maxsize: int = 64):
+        self.maxsize = maxsize
+        self._local = threading.local()
+
+    def _free_list(self) -> deque:
+        free = getattr(self._local, "free", None)
+        if free is None:
+            free = self._local.free = deque()
+        return free
+
+    def acquire(
+        self,
+        type: str,
+        payload: Dict[str, Any],
+        user_id: Optional[str] = None,
+        group_ids: Optional[List[str]] = None
+    ) -> NotificationMessage:
+        if not isinstance(type, str):
+            raise TypeError(f"type must be a str, not {type.__class__.__name__}")
+        if not isinstance(payload, dict):
+            raise TypeError(f"payload must be a dict, not {payload.__class__.__name__}")
+
+        free = self._free_list()
+        if free:
+            message = free.pop()
+        else:
+            # Every field is assigned below, so skip validation here too
+            message = NotificationMessage.model_construct(_fields_set=set(self._FIELDS))
+
+        fields = message.__dict__
+        fields["type"] = type
+        fields["payload"] = payload
+        fields["timestamp"] = _now()
+        fields["user_id"] = user_id
+        fields["group_ids"] = group_ids
+        return message
+
+    def release(self, message: NotificationMessage):
+        free = self._free_list()
+        if len(free) < self.maxsize:
+            # Don't keep the caller's payload alive while pooled
+            message.__dict__["payload"] = None
+            free.append(message)
+
+
+message_pool = MessagePool()
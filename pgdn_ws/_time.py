@@ -0,0 +1,12 @@
+# pgdn_ws/_time.py
+"""
+Timestamp helpers shared by the notify and rate limit responses.
+"""
+
+import datetime
+
+
+def now_iso() -> str:
+    """Current UTC time as ISO 8601 with a Z suffix."""
+    # isoformat() of an aware UTC datetime always ends in "+00:00"
+    return datetime.datetime.now(datetime.timezone.utc).isoformat()[:-6] + "Z"
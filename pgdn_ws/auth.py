@@ -1,6 +1,18 @@
-from typing import Optional, Dict, Any
+import hashlib
+import time
+from typing import Any, Callable, Mapping, Optional, cast
+from ._cache import TTLCache
+from .types import AuthHandler, UserInfo
 
-async def default_auth_handler(token: str) -> Optional[Dict[str, Any]]:
+_MISSING = object()
+
+
+def _jwt_exp(user_info: UserInfo) -> Optional[float]:
+    """The numeric "exp" claim of user_info, if the handler passed it through."""
+    exp = cast(Mapping[str, Any], user_info).get("exp")
+    return exp if isinstance(exp, (int, float)) else None
+
+async def default_auth_handler(token: str) -> Optional[UserInfo]:
     """
     Default auth handler - override this with your own implementation
 
@@ -15,3 +27,56 @@ async def default_auth_handler(token: str) -> Optional[Dict[str, Any]]:
             "groups": ["admin", "users"]
         }
     return None
+
+def cached_auth_handler(
+    inner: AuthHandler,
+    ttl: float = 10,
+    maxsize: int = 10_000,
+    negative_ttl: float = 2,
+    expires_at: Callable[[UserInfo], Optional[float]] = _jwt_exp
+) -> AuthHandler:
+    """
+    Wrap an auth handler so repeated tokens skip re-verification
+
+    Useful when the handler does expensive work (RS256/ES256 signature
+    checks, a call to an identity provider) and clients reconnect often.
+
+    - ttl: seconds a successful result is reused. A revoked token keeps
+      working for up to this long, so keep it short.
+    - negative_ttl: seconds a failed (None) result is reused, which blunts
+      repeated probing with bad tokens without locking out a fixed token
+      for long.
+    - maxsize: number of tokens kept; least recently used are evicted.
+    - expires_at: returns the Unix time a result stops being valid, or
+      None. Entries never outlive it, so an expired token isn't accepted
+      from the cache. By default this reads a numeric "exp" key from the
+      user info; without one, only ttl applies.
+
+    Tokens are keyed by a 16-byte BLAKE2b digest, so raw tokens are never
+    held in memory by the cache. Each call gets its own shallow copy of
+    the user info. The cache is exposed as ``.cache`` on the returned
+    handler so it can be cleared, e.g. on logout.
+    """
+    cache = TTLCache(maxsize)
+
+    async def wrapper(token: str) -> Optional[UserInfo]:
+        key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+        cached = cache.get(key, _MISSING)
+        if cached is not _MISSING:
+            return cached.copy() if cached else cached
+
+        user_info = await inner(token)
+        if not user_info:
+            cache.set(key, user_info, negative_ttl)
+            return user_info
+
+        entry_ttl = ttl
+        expiry = expires_at(user_info)
+        if expiry is not None:
+            entry_ttl = min(ttl, expiry - time.time())
+        if entry_ttl > 0:
+            cache.set(key, user_info.copy(), entry_ttl)
+        return user_info
+
+    setattr(wrapper, "cache", cache)
+    return wrapper
@@ -7,6 +7,7 @@ import sys
 import argparse
 from typing import Dict, Any
 
+from . import _json
 from .notify import notify
 
 
@@ -89,19 +90,19 @@ def read_json_from_stdin() -> Dict[str, Any]:
         content = sys.stdin.read().strip()
         if not content:
             raise ValueError("No input provided")
-        return json.loads(content)
-    except json.JSONDecodeError as e:
+        return _json.loads(content)
+    except _json.JSONDecodeError as e:
         raise ValueError(f"Invalid JSON from stdin: {e}")
 
 
 def read_json_from_file(filepath: str) -> Dict[str, Any]:
     """Read and parse JSON from file."""
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        with open(filepath, 'rb') as f:
+            return _json.loads(f.read())
     except FileNotFoundError:
         raise ValueError(f"File not found: {filepath}")
-    except json.JSONDecodeError as e:
+    except _json.JSONDecodeError as e:
         raise ValueError(f"Invalid JSON in file {filepath}: {e}")
     except Exception as e:
         raise ValueError(f"Error reading file {filepath}: {e}")
@@ -1,6 +1,6 @@
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Iterable
 from .manager import notification_manager, NotificationManager
-from .types import NotificationMessage
+from ._pool import message_pool
 
 class NotificationClient:
     """Client for sending notifications from within your FastAPI app"""
@@ -8,6 +8,34 @@ class NotificationClient:
     def __init__(self, manager: NotificationManager = None):
         self.manager = manager or notification_manager
 
+    def _encode(
+        self,
+        message_type: str,
+        payload: Dict[str, Any],
+        user_id: Optional[str] = None,
+        group_ids: Optional[List[str]] = None
+    ) -> str:
+        """
+        Build and encode a message in one step
+
+        The message never outlives this call, so it comes from the shared
+        pool and skips Pydantic validation - the arguments are already typed.
+        """
+        message = message_pool.acquire(
+            type=message_type,
+            payload=payload,
+            user_id=user_id,
+            group_ids=group_ids
+        )
+        try:
+            return self.manager.encode_message(message)
+        finally:
+            message_pool.release(message)
+
+    def _connected_users(self, user_ids: List[str]) -> List[str]:
+        """Filter user_ids down to users with an open connection"""
+        return [user_id for user_id in user_ids if self.manager.is_user_connected(user_id)]
+
     # Async methods (for use in FastAPI endpoints)
     async def notify_user(
         self,
@@ -16,12 +44,8 @@ class NotificationClient:
         payload: Dict[str, Any]
     ):
         """Send notification to a specific user"""
-        message = NotificationMessage(
-            type=message_type,
-            payload=payload,
-            user_id=user_id
-        )
-        await self.manager.send_to_user(user_id, message)
+        frame = self._encode(message_type, payload, user_id=user_id)
+        await self.manager.send_raw_to_user(user_id, frame)
 
     async def notify_users(
         self,
@@ -30,11 +54,12 @@ class NotificationClient:
         payload: Dict[str, Any]
     ):
         """Send notification to multiple users"""
-        message = NotificationMessage(
-            type=message_type,
-            payload=payload
-        )
-        await self.manager.send_to_users(user_ids, message)
+        user_ids = self._connected_users(user_ids)
+        if not user_ids:
+            return
+        # Encode once and fan the same frame out to every user
+        frame = self._encode(message_type, payload)
+        await self.manager.send_raw_to_users(user_ids, frame)
 
     async def notify_group(
         self,
@@ -43,25 +68,22 @@ class NotificationClient:
         payload: Dict[str, Any]
     ):
         """Send notification to a group"""
-        message = NotificationMessage(
-            type=message_type,
-            payload=payload,
-            group_ids=[group_id]
-        )
-        await self.manager.send_to_group(group_id, message)
+        if not self.manager.is_group_connected(group_id):
+            return
+        frame = self._encode(message_type, payload, group_ids=[group_id])
+        await self.manager.send_raw_to_group(group_id, frame)
 
     async def broadcast(
         self,
         message_type: str,
         payload: Dict[str, Any],
-        exclude_users: Optional[List[str]] = None
+        exclude_users: Optional[Iterable[str]] = None
     ):
         """Broadcast to all users"""
-        message = NotificationMessage(
-            type=message_type,
-            payload=payload
-        )
-        await self.manager.broadcast(message, exclude_users)
+        if self.manager.connection_count == 0:
+            return
+        frame = self._encode(message_type, payload)
+        await self.manager.broadcast_raw(frame, exclude_users)
 
     # Sync methods for synchronous contexts
     def notify_user_sync(
@@ -71,12 +93,8 @@ class NotificationClient:
         payload: Dict[str, Any]
     ):
         """Send notification to a specific user (sync version)"""
-        message = NotificationMessage(
-            type=message_type,
-            payload=payload,
-            user_id=user_id
-        )
-        self.manager.send_to_user_sync(user_id, message)
+        frame = self._encode(message_type, payload, user_id=user_id)
+        self.manager.send_raw_to_user_sync(user_id, frame)
 
     def notify_users_sync(
         self,
@@ -85,11 +103,11 @@ class NotificationClient:
         payload: Dict[str, Any]
     ):
         """Send notification to multiple users (sync version)"""
-        message = NotificationMessage(
-            type=message_type,
-            payload=payload
-        )
-        self.manager.send_to_users_sync(user_ids, message)
+        user_ids = self._connected_users(user_ids)
+        if not user_ids:
+            return
+        frame = self._encode(message_type, payload)
+        self.manager.send_raw_to_users_sync(user_ids, frame)
 
     def notify_group_sync(
         self,
@@ -98,25 +116,22 @@ class NotificationClient:
         payload: Dict[str, Any]
     ):
         """Send notification to a group (sync version)"""
-        message = NotificationMessage(
-            type=message_type,
-            payload=payload,
-            group_ids=[group_id]
-        )
-        self.manager.send_to_group_sync(group_id, message)
+        if not self.manager.is_group_connected(group_id):
+            return
+        frame = self._encode(message_type, payload, group_ids=[group_id])
+        self.manager.send_raw_to_group_sync(group_id, frame)
 
     def broadcast_sync(
         self,
         message_type: str,
         payload: Dict[str, Any],
-        exclude_users: Optional[List[str]] = None
+        exclude_users: Optional[Iterable[str]] = None
     ):
         """Broadcast to all users (sync version)"""
-        message = NotificationMessage(
-            type=message_type,
-            payload=payload
-        )
-        self.manager.broadcast_sync(message, exclude_users)
+        if self.manager.connection_count == 0:
+            return
+        frame = self._encode(message_type, payload)
+        self.manager.broadcast_raw_sync(frame, exclude_users)
 
     def get_stats(self) -> Dict[str, Any]:
         """Get connection statistics"""
@@ -2,15 +2,112 @@
 Configuration loading for pgdn-notify.
 """
 
+import copy
 import os
 import json
-from typing import Dict, Any, Optional
+import functools
+import importlib.util
+import threading
+from typing import Dict, Any, Optional, Tuple
 
-try:
-    import yaml
-    YAML_AVAILABLE = True
-except ImportError:
-    YAML_AVAILABLE = False
+# PyYAML is imported only when a YAML file is actually read, so JSON and
+# env-only setups don't pay for it at startup
+YAML_AVAILABLE = importlib.util.find_spec("yaml") is not None
+
+_NOTIFICATION_TYPES = ("slack", "email", "webhook", "websocket")
+
+# (notification type, calls variable, period variable)
+_RATE_LIMIT_ENV_KEYS = tuple(
+    (t, f"PGDN_NOTIFY_RATE_LIMIT_{t.upper()}_CALLS", f"PGDN_NOTIFY_RATE_LIMIT_{t.upper()}_PERIOD")
+    for t in _NOTIFICATION_TYPES
+)
+
+_ENV_PREFIX = "PGDN_NOTIFY_"
+
+# Snapshot of the PGDN_NOTIFY_* variables, taken on first use
+_env_cache: Optional[Dict[str, str]] = None
+_env_cache_lock = threading.Lock()
+
+# JSON first: it parses much faster than YAML and needs no extra dependency
+_DEFAULT_CONFIG_PATHS = (
+    "pgdn_ws_config.json",
+    "pgdn_ws_config.yml",
+    "pgdn_ws_config.yaml",
+)
+
+# config_path -> (mtimes of the candidate files, merged config)
+_config_cache: Dict[Optional[str], Tuple[Tuple[Optional[int], ...], Dict[str, Any]]] = {}
+
+# Bumped whenever load_config re-reads its sources or the cache is cleared,
+# so consumers can keep derived state until the config actually reloads
+_config_generation = 0
+
+
+def _get_env() -> Dict[str, str]:
+    global _env_cache
+
+    env = _env_cache
+    if env is None:
+        with _env_cache_lock:
+            if _env_cache is None:
+                _env_cache = {
+                    key: value for key, value in os.environ.items()
+                    if key.startswith(_ENV_PREFIX)
+                }
+            env = _env_cache
+    return env
+
+
+def reset_env_cache() -> None:
+    """
+    Drop the environment snapshot used by load_config_from_env.
+
+    Call this after changing PGDN_NOTIFY_* variables at runtime (e.g. in
+    tests) so the next load picks them up.
+    """
+    global _env_cache
+    with _env_cache_lock:
+        _env_cache = None
+    clear_config_cache()
+
+
+def clear_config_cache() -> None:
+    """Forget configs cached by load_config so the next call re-reads the files."""
+    global _config_generation
+    _config_cache.clear()
+    _config_generation += 1
+
+
+def config_generation(config_path: Optional[str] = None) -> int:
+    """
+    Counter that changes each time load_config reloads or the cache is cleared.
+
+    The candidate files are checked first, so an edited config file bumps
+    the counter without anyone calling load_config or clear_config_cache.
+    """
+    _load_cached(config_path)
+    return _config_generation
+
+
+def _mtime_ns(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+@functools.lru_cache(maxsize=None)
+def _get_yaml():
+    """Import PyYAML and pick its fastest safe loader"""
+    try:
+        import yaml
+    except ImportError:
+        raise ImportError("PyYAML not available. Install with: pip install PyYAML")
+    try:
+        from yaml import CSafeLoader as loader
+    except ImportError:
+        from yaml import SafeLoader as loader
+    return yaml, loader
 
 
 def load_config_from_file(config_path: str) -> Dict[str, Any]:
@@ -28,12 +125,10 @@ def load_config_from_file(config_path: str) -> Dict[str, Any]:
     
     try:
         with open(config_path, 'r', encoding='utf-8') as f:
-            if config_path.endswith(('.yml', '.yaml')):
-                if not YAML_AVAILABLE:
-                    raise ImportError("PyYAML not available. Install with: pip install PyYAML")
-                return yaml.safe_load(f) or {}
-            else:
+            if not config_path.endswith(('.yml', '.yaml')):
                 return json.load(f)
+            yaml, loader = _get_yaml()
+            return yaml.load(f, Loader=loader) or {}
     except Exception as e:
         print(f"Warning: Could not load config file {config_path}: {e}")
         return {}
@@ -55,24 +150,23 @@ def load_config_from_env() -> Dict[str, Any]:
     - PGDN_NOTIFY_RATE_LIMIT_WEBSOCKET_PERIOD: Websocket rate limit period
     - PGDN_NOTIFY_USE_REDIS_RATE_LIMIT: Use Redis for rate limiting (true/false)
     
+    The variables are read once and cached; call reset_env_cache() after
+    changing them at runtime.
+    
     Returns:
         Configuration dictionary
     """
     config = {}
+    env = _get_env()
     
     # Check if rate limiting is enabled
-    if os.getenv("PGDN_NOTIFY_RATE_LIMIT_ENABLED", "").lower() == "true":
+    if env.get("PGDN_NOTIFY_RATE_LIMIT_ENABLED", "").lower() == "true":
         config["rate_limits"] = {}
         
         # Load rate limits for each notification type
-        notification_types = ["slack", "email", "webhook", "websocket"]
-        
-        for notification_type in notification_types:
-            calls_key = f"PGDN_NOTIFY_RATE_LIMIT_{notification_type.upper()}_CALLS"
-            period_key = f"PGDN_NOTIFY_RATE_LIMIT_{notification_type.upper()}_PERIOD"
-            
-            calls = os.getenv(calls_key)
-            period = os.getenv(period_key)
+        for notification_type, calls_key, period_key in _RATE_LIMIT_ENV_KEYS:
+            calls = env.get(calls_key)
+            period = env.get(period_key)
             
             if calls and period:
                 try:
@@ -84,7 +178,7 @@ def load_config_from_env() -> Dict[str, Any]:
                     print(f"Warning: Invalid rate limit values for {notification_type}")
     
     # Redis configuration
-    if os.getenv("PGDN_NOTIFY_USE_REDIS_RATE_LIMIT", "").lower() == "true":
+    if env.get("PGDN_NOTIFY_USE_REDIS_RATE_LIMIT", "").lower() == "true":
         config["use_redis_rate_limit"] = True
     
     return config
@@ -96,33 +190,46 @@ def load_config(config_path: Optional[str] = None) -> Dict[str, Any]:
     
     Priority order:
     1. Provided config file
-    2. ./pgdn_ws_config.yml
-    3. ./pgdn_ws_config.yaml
-    4. ./pgdn_ws_config.json
+    2. ./pgdn_ws_config.json
+    3. ./pgdn_ws_config.yml
+    4. ./pgdn_ws_config.yaml
     5. Environment variables
     
+    Only the first default file found is used, so JSON is preferred when
+    several exist.
+    
+    The merged result is cached and reused until one of the candidate
+    files changes (by mtime); clear_config_cache() forces a reload. Each
+    call returns its own deep copy, so callers may modify it freely.
+    
     Args:
         config_path: Optional path to config file
         
     Returns:
         Merged configuration dictionary
     """
-    config = {}
+    return copy.deepcopy(_load_cached(config_path))
+
+
+def _load_cached(config_path: Optional[str]) -> Dict[str, Any]:
+    """Merged config for config_path, re-read only when a candidate file changed"""
+    candidates = _DEFAULT_CONFIG_PATHS + (config_path,) if config_path else _DEFAULT_CONFIG_PATHS
+    mtimes = tuple(_mtime_ns(path) for path in candidates)
+    
+    cached = _config_cache.get(config_path)
+    if cached is not None and cached[0] == mtimes:
+        return cached[1]
+    
+    config: Dict[str, Any] = {}
     
     # Load from environment variables first (lowest priority)
     env_config = load_config_from_env()
     if env_config:
         config.update(env_config)
     
-    # Load from default config files
-    default_paths = [
-        "pgdn_ws_config.yml",
-        "pgdn_ws_config.yaml", 
-        "pgdn_ws_config.json"
-    ]
-    
-    for path in default_paths:
-        if os.path.exists(path):
+    # Load from the first default config file that exists
+    for path, mtime in zip(_DEFAULT_CONFIG_PATHS, mtimes):
+        if mtime is not None:
             file_config = load_config_from_file(path)
             if file_config:
                 config.update(file_config)
@@ -134,4 +241,7 @@ def load_config(config_path: Optional[str] = None) -> Dict[str, Any]:
         if file_config:
             config.update(file_config)
     
-    return config 
\ No newline at end of file
+    global _config_generation
+    _config_cache[config_path] = (mtimes, config)
+    _config_generation += 1
+    return config
@@ -1,26 +1,97 @@
 # pgdn_ws/manager.py
-from typing import Dict, Set, List, Optional, Any
+from typing import Dict, Set, List, Optional, Any, Iterable
 from fastapi import WebSocket
-import json
 import asyncio
 import logging
+import operator
+import threading
 from datetime import datetime, UTC
-from .types import NotificationMessage, MessageHandler
+import pydantic
+from . import _json
+from .types import NotificationMessage, MessageHandler, UserInfo
 
 logger = logging.getLogger("pgdn-ws")
 
+# Event loop used by the sync methods, started on first use
+_background_loop: Optional[asyncio.AbstractEventLoop] = None
+_background_loop_lock = threading.Lock()
+
+def _get_background_loop() -> asyncio.AbstractEventLoop:
+    """Get or start the shared event loop thread for sync callers"""
+    global _background_loop
+    
+    if _background_loop is None:
+        with _background_loop_lock:
+            if _background_loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=loop.run_forever,
+                    name="pgdn-ws-sync",
+                    daemon=True
+                )
+                thread.start()
+                _background_loop = loop
+    
+    return _background_loop
+
+
+# Fixed leading parts of control frames; only the trailing fields vary
+_CONNECTED_PREFIX = '{"type":"connection","status":"connected","user_id":'
+_PONG_PREFIX = '{"type":"pong","timestamp":'
+
+
+# Pydantic v2 names it model_dump, v1 dict; the version can't change at runtime
+_dump = operator.methodcaller(
+    'model_dump' if int(pydantic.VERSION.split('.')[0]) >= 2 else 'dict'
+)
+
+
+def _message_to_dict(message: NotificationMessage) -> Dict[str, Any]:
+    """Dump a message to a plain dict with an ISO 8601 timestamp"""
+    data = _dump(message)
+        
+    # Ensure timestamp is serialized
+    if isinstance(data.get('timestamp'), datetime):
+        data['timestamp'] = data['timestamp'].isoformat()
+        
+    return data
+
+
+class _Outbox:
+    """Outgoing frames for one connection, drained by a single writer task"""
+    __slots__ = ("queue", "task", "batch")
+    
+    def __init__(self, maxsize: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.task: Optional[asyncio.Task] = None
+        # Coalesce queued frames into one JSON array per send (client opt-in)
+        self.batch = False
+
 class NotificationManager:
-    def __init__(self):
+    def __init__(self, max_queue_size: int = 256, sync_timeout: Optional[float] = None):
+        # Frames buffered per connection before the oldest are dropped
+        self.max_queue_size = max_queue_size
+        # Seconds a sync method waits for its send to finish (None = no limit)
+        self.sync_timeout = sync_timeout
+        # Event loop the connections were accepted on
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Per-connection outgoing queues
+        self._outboxes: Dict[WebSocket, _Outbox] = {}
+        # Frames dropped because a connection's queue was full
+        self._dropped_frames = 0
+        # Sends scheduled by sync calls made from inside the event loop
+        self._pending_sends: Set[asyncio.Task] = set()
         # Store connections by user_id
         self._user_connections: Dict[str, Set[WebSocket]] = {}
-        # Store connections by group_id
+        # Store connections by group_id; kept in step with connect/disconnect
+        # so group sends touch only members, never the full connection set
         self._group_connections: Dict[str, Set[WebSocket]] = {}
         # Map websocket to user info
-        self._connection_info: Dict[WebSocket, Dict[str, Any]] = {}
+        self._connection_info: Dict[WebSocket, UserInfo] = {}
         # Message handlers
         self._message_handlers: Dict[str, MessageHandler] = {}
         
-    async def connect(self, websocket: WebSocket, user_info: Dict[str, Any]):
+    async def connect(self, websocket: WebSocket, user_info: UserInfo):
         """Connect a user websocket"""
         await websocket.accept()
         
@@ -32,25 +103,27 @@ class NotificationManager:
         
         # Add to user connections
         if user_id:
-            if user_id not in self._user_connections:
-                self._user_connections[user_id] = set()
-            self._user_connections[user_id].add(websocket)
+            self._user_connections.setdefault(user_id, set()).add(websocket)
         
         # Add to group connections
+        group_connections = self._group_connections
         for group_id in groups:
-            if group_id not in self._group_connections:
-                self._group_connections[group_id] = set()
-            self._group_connections[group_id].add(websocket)
+            group_connections.setdefault(group_id, set()).add(websocket)
         
         logger.info(f"User {user_id} connected with groups {groups}")
         
-        # Send connection confirmation
-        await self._send_to_websocket(websocket, {
-            "type": "connection",
-            "status": "connected",
-            "user_id": user_id,
-            "timestamp": datetime.now(UTC).isoformat()
-        })
+        # Start the connection's writer; every send from here on is queued
+        self._loop = asyncio.get_running_loop()
+        outbox = _Outbox(self.max_queue_size)
+        outbox.task = asyncio.create_task(self._write_loop(websocket, outbox))
+        self._outboxes[websocket] = outbox
+        
+        # Send connection confirmation; only user_id and timestamp vary.
+        # An ISO timestamp never needs JSON escaping.
+        self._enqueue(
+            websocket,
+            f'{_CONNECTED_PREFIX}{_json.dumps(user_id)},"timestamp":"{datetime.now(UTC).isoformat()}"}}'
+        )
     
     def disconnect(self, websocket: WebSocket):
         """Disconnect a websocket"""
@@ -62,166 +135,230 @@ class NotificationManager:
         groups = info.get("groups", [])
         
         # Remove from user connections
-        if user_id and user_id in self._user_connections:
-            self._user_connections[user_id].discard(websocket)
-            if not self._user_connections[user_id]:
-                del self._user_connections[user_id]
+        connections = self._user_connections.get(user_id)
+        if connections is not None:
+            connections.discard(websocket)
+            if not connections:
+                self._user_connections.pop(user_id, None)
         
         # Remove from group connections
+        group_connections = self._group_connections
         for group_id in groups:
-            if group_id in self._group_connections:
-                self._group_connections[group_id].discard(websocket)
-                if not self._group_connections[group_id]:
-                    del self._group_connections[group_id]
+            connections = group_connections.get(group_id)
+            if connections is not None:
+                connections.discard(websocket)
+                if not connections:
+                    group_connections.pop(group_id, None)
         
         # Clean up connection info
-        del self._connection_info[websocket]
+        self._connection_info.pop(websocket, None)
+        
+        # Stop the writer and discard anything still queued
+        outbox = self._outboxes.pop(websocket, None)
+        if outbox is not None:
+            if outbox.task is not None:
+                outbox.task.cancel()
+            queue = outbox.queue
+            while not queue.empty():
+                queue.get_nowait()
+                queue.task_done()
         
         logger.info(f"User {user_id} disconnected")
     
-    async def _send_to_websocket(self, websocket: WebSocket, data: dict):
-        """Send data to a specific websocket"""
-        try:
-            await websocket.send_json(data)
-        except Exception as e:
-            logger.error(f"Error sending to websocket: {e}")
-            self.disconnect(websocket)
+    def _enqueue(self, websocket: WebSocket, frame: str) -> bool:
+        """Queue a pre-encoded frame for a websocket's writer"""
+        outbox = self._outboxes.get(websocket)
+        if outbox is None:
+            return False
+        queue = outbox.queue
+        if queue.full():
+            # Slow consumer: drop its oldest frame rather than hold up
+            # other connections, so it catches up on the latest state
+            queue.get_nowait()
+            queue.task_done()
+            self._dropped_frames += 1
+        queue.put_nowait(frame)
+        return True
+    
+    def _fan_out(self, websockets: Iterable[WebSocket], frame: str) -> int:
+        """
+        Queue a frame for many websockets
+        
+        This never awaits, so the live connection sets can be passed in
+        directly: nothing can connect or disconnect while they're iterated.
+        
+        Each connection has its own writer task, so one slow client doesn't
+        hold up the rest. Each socket receives frames in the order they were
+        queued, but there is no ordering guarantee across different sockets.
+        Returns the number of connections the frame was queued for.
+        """
+        queued = 0
+        for websocket in websockets:
+            if self._enqueue(websocket, frame):
+                queued += 1
+        return queued
+    
+    async def _write_loop(self, websocket: WebSocket, outbox: _Outbox):
+        """Send a connection's queued frames until it disconnects"""
+        queue = outbox.queue
+        while True:
+            frame = await queue.get()
+            count = 1
+            if outbox.batch:
+                frames = [frame]
+                while not queue.empty():
+                    frames.append(queue.get_nowait())
+                count = len(frames)
+                frame = "[" + ",".join(frames) + "]"
+            try:
+                await websocket.send_text(frame)
+            except Exception as e:
+                logger.error(f"Error sending to websocket: {e}")
+                self.disconnect(websocket)
+                return
+            finally:
+                for _ in range(count):
+                    queue.task_done()
+    
+    async def flush(self):
+        """Wait until every frame queued so far has been sent"""
+        await asyncio.gather(*(outbox.queue.join() for outbox in list(self._outboxes.values())))
+    
+    def encode_message(self, message: NotificationMessage) -> str:
+        """Serialize a message to a JSON text frame, once for any number of sockets"""
+        if isinstance(message, NotificationMessage):
+            return message.to_json()
+        
+        return _json.dumps(_message_to_dict(message))
     
     async def send_to_user(self, user_id: str, message: NotificationMessage):
         """Send notification to specific user"""
+        await self.send_raw_to_user(user_id, self.encode_message(message))
+    
+    async def send_raw_to_user(self, user_id: str, frame: str):
+        """Send a pre-encoded frame to specific user"""
         logger.info(f"send_to_user called for {user_id}")
         
-        if user_id not in self._user_connections:
+        connections = self._user_connections.get(user_id)
+        if not connections:
             logger.warning(f"User {user_id} not connected")
             return
             
-        # Get the message data with proper serialization
-        if hasattr(message, 'model_dump'):
-            data = message.model_dump()  # Pydantic v2
-        else:
-            data = message.dict()  # Pydantic v1
-            
-        # Ensure timestamp is serialized
-        if isinstance(data.get('timestamp'), datetime):
-            data['timestamp'] = data['timestamp'].isoformat()
-            
-        logger.info(f"Sending message to {user_id}: {data}")
-        
-        dead_connections = []
-        
-        for websocket in self._user_connections[user_id]:
-            try:
-                await websocket.send_json(data)
-                logger.info(f"Message sent successfully to {user_id}")
-            except Exception as e:
-                logger.error(f"Failed to send message: {e}")
-                dead_connections.append(websocket)
+        logger.info(f"Sending message to {user_id}: {frame}")
         
-        # Clean up dead connections
-        for conn in dead_connections:
-            self.disconnect(conn)
+        if self._fan_out(connections, frame):
+            logger.info(f"Message queued for {user_id}")
     
     async def send_to_users(self, user_ids: List[str], message: NotificationMessage):
         """Send notification to multiple users"""
-        tasks = []
+        await self.send_raw_to_users(user_ids, self.encode_message(message))
+    
+    async def send_raw_to_users(self, user_ids: List[str], frame: str):
+        """Send a pre-encoded frame to multiple users"""
+        # Queueing never awaits, so there's nothing to gather
+        user_connections = self._user_connections
         for user_id in user_ids:
-            tasks.append(self.send_to_user(user_id, message))
-        await asyncio.gather(*tasks, return_exceptions=True)
+            connections = user_connections.get(user_id)
+            if connections:
+                self._fan_out(connections, frame)
     
     async def send_to_group(self, group_id: str, message: NotificationMessage):
         """Send notification to all users in a group"""
         if group_id not in self._group_connections:
             return
-            
-        if hasattr(message, 'model_dump'):
-            data = message.model_dump()
-        else:
-            data = message.dict()
-            
-        if isinstance(data.get('timestamp'), datetime):
-            data['timestamp'] = data['timestamp'].isoformat()
-            
-        dead_connections = []
-        
-        for websocket in self._group_connections[group_id]:
-            try:
-                await websocket.send_json(data)
-            except Exception:
-                dead_connections.append(websocket)
-        
-        # Clean up dead connections
-        for conn in dead_connections:
-            self.disconnect(conn)
+        await self.send_raw_to_group(group_id, self.encode_message(message))
+    
+    async def send_raw_to_group(self, group_id: str, frame: str):
+        """Send a pre-encoded frame to all users in a group"""
+        connections = self._group_connections.get(group_id)
+        if connections:
+            self._fan_out(connections, frame)
     
-    async def broadcast(self, message: NotificationMessage, exclude_users: Optional[List[str]] = None):
+    async def broadcast(self, message: NotificationMessage, exclude_users: Optional[Iterable[str]] = None):
         """Broadcast to all connected users"""
-        exclude_users = exclude_users or []
+        await self.broadcast_raw(self.encode_message(message), exclude_users)
+    
+    async def broadcast_raw(self, frame: str, exclude_users: Optional[Iterable[str]] = None):
+        """Broadcast a pre-encoded frame to all connected users"""
+        if not exclude_users:
+            self._fan_out(self._connection_info, frame)
+            return
         
-        if hasattr(message, 'model_dump'):
-            data = message.model_dump()
-        else:
-            data = message.dict()
-            
-        if isinstance(data.get('timestamp'), datetime):
-            data['timestamp'] = data['timestamp'].isoformat()
+        exclude = frozenset(exclude_users)
+        self._fan_out(
+            (
+                websocket
+                for user_id, connections in self._user_connections.items()
+                if user_id not in exclude
+                for websocket in connections
+            ),
+            frame
+        )
+    
+    # Sync methods for synchronous contexts
+    def _run_sync(self, coro_fn, *args):
+        """
+        Run a coroutine function to completion from synchronous code
+        
+        The coroutine runs on the loop that owns the connections, since
+        their queues and sockets aren't thread-safe. Before any connection
+        exists it runs on one long-lived background loop instead of a new
+        loop per call. When called from inside the target loop itself the
+        send is scheduled and the call returns without waiting, as blocking
+        would deadlock.
+        """
+        loop = self._loop
+        if loop is None or not loop.is_running():
+            loop = _get_background_loop()
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
         
-        tasks = []
-        for user_id, connections in self._user_connections.items():
-            if user_id not in exclude_users:
-                for websocket in connections:
-                    tasks.append(self._send_to_websocket(websocket, data))
+        if running_loop is loop:
+            task = loop.create_task(coro_fn(*args))
+            self._pending_sends.add(task)
+            task.add_done_callback(self._pending_sends.discard)
+            return
         
-        await asyncio.gather(*tasks, return_exceptions=True)
+        future = asyncio.run_coroutine_threadsafe(coro_fn(*args), loop)
+        try:
+            return future.result(timeout=self.sync_timeout)
+        except BaseException:
+            future.cancel()
+            raise
     
-    # Sync methods for synchronous contexts
     def send_to_user_sync(self, user_id: str, message: NotificationMessage):
         """Send notification to specific user (sync version)"""
-        try:
-            asyncio.run(self.send_to_user(user_id, message))
-        except RuntimeError:
-            # If we're already in an event loop, create a new one
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                loop.run_until_complete(self.send_to_user(user_id, message))
-            finally:
-                loop.close()
+        self._run_sync(self.send_to_user, user_id, message)
+    
+    def send_raw_to_user_sync(self, user_id: str, frame: str):
+        """Send a pre-encoded frame to specific user (sync version)"""
+        self._run_sync(self.send_raw_to_user, user_id, frame)
     
     def send_to_users_sync(self, user_ids: List[str], message: NotificationMessage):
         """Send notification to multiple users (sync version)"""
-        try:
-            asyncio.run(self.send_to_users(user_ids, message))
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                loop.run_until_complete(self.send_to_users(user_ids, message))
-            finally:
-                loop.close()
+        self._run_sync(self.send_to_users, user_ids, message)
+    
+    def send_raw_to_users_sync(self, user_ids: List[str], frame: str):
+        """Send a pre-encoded frame to multiple users (sync version)"""
+        self._run_sync(self.send_raw_to_users, user_ids, frame)
     
     def send_to_group_sync(self, group_id: str, message: NotificationMessage):
         """Send notification to all users in a group (sync version)"""
-        try:
-            asyncio.run(self.send_to_group(group_id, message))
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                loop.run_until_complete(self.send_to_group(group_id, message))
-            finally:
-                loop.close()
+        self._run_sync(self.send_to_group, group_id, message)
     
-    def broadcast_sync(self, message: NotificationMessage, exclude_users: Optional[List[str]] = None):
+    def send_raw_to_group_sync(self, group_id: str, frame: str):
+        """Send a pre-encoded frame to all users in a group (sync version)"""
+        self._run_sync(self.send_raw_to_group, group_id, frame)
+    
+    def broadcast_sync(self, message: NotificationMessage, exclude_users: Optional[Iterable[str]] = None):
         """Broadcast to all connected users (sync version)"""
-        try:
-            asyncio.run(self.broadcast(message, exclude_users))
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                loop.run_until_complete(self.broadcast(message, exclude_users))
-            finally:
-                loop.close()
+        self._run_sync(self.broadcast, message, exclude_users)
+    
+    def broadcast_raw_sync(self, frame: str, exclude_users: Optional[Iterable[str]] = None):
+        """Broadcast a pre-encoded frame to all connected users (sync version)"""
+        self._run_sync(self.broadcast_raw, frame, exclude_users)
     
     def register_handler(self, message_type: str, handler: MessageHandler):
         """Register a custom message handler"""
@@ -230,29 +367,49 @@ class NotificationManager:
     async def handle_message(self, websocket: WebSocket, message: dict):
         """Handle incoming websocket message"""
         message_type = message.get("type")
-        user_info = self._connection_info.get(websocket, {})
         
         # Built-in handlers
         if message_type == "ping":
-            await self._send_to_websocket(websocket, {
-                "type": "pong",
-                "timestamp": message.get("timestamp")
-            })
+            # Echo the client's timestamp (JSON null if it sent none)
+            self._enqueue(websocket, f'{_PONG_PREFIX}{_json.dumps(message.get("timestamp"))}}}')
+            return
+        
+        if message_type == "set_batch":
+            # Client opts in to receiving queued frames as one JSON array.
+            # Not plain "batch", which apps may already use for their own handlers
+            outbox = self._outboxes.get(websocket)
+            if outbox is not None:
+                outbox.batch = bool(message.get("enabled", True))
             return
         
         # Custom handlers
         handler = self._message_handlers.get(message_type)
         if handler:
-            user_id = user_info.get("user_id")
+            user_info = self._connection_info.get(websocket)
+            user_id = user_info.get("user_id") if user_info is not None else None
             await handler(message, user_id)
     
+    @property
+    def connection_count(self) -> int:
+        """Number of open connections"""
+        return len(self._connection_info)
+    
+    def is_user_connected(self, user_id: str) -> bool:
+        """Check whether a user has at least one open connection"""
+        return user_id in self._user_connections
+    
+    def is_group_connected(self, group_id: str) -> bool:
+        """Check whether a group has at least one open connection"""
+        return group_id in self._group_connections
+    
     def get_stats(self) -> dict:
         """Get connection statistics"""
         return {
             "total_users": len(self._user_connections),
             "total_connections": sum(len(conns) for conns in self._user_connections.values()),
             "groups": list(self._group_connections.keys()),
-            "users": list(self._user_connections.keys())
+            "users": list(self._user_connections.keys()),
+            "dropped_frames": self._dropped_frames
         }
 
 # Global manager instance
@@ -2,15 +2,15 @@
 Core notification system that routes notifications to appropriate handlers.
 """
 
-import datetime
-from typing import Dict, Any, Callable, Optional
+from typing import Dict, Any, Callable, Optional, Tuple
 
 from .types.slack import notify_slack
 from .types.email import notify_email
 from .types.webhook import notify_webhook
 from .types.websocket import notify_websocket
-from .config import load_config
+from .config import load_config, config_generation
 from .rate_limit import RateLimitManager, RateLimitConfig
+from ._time import now_iso
 
 
 # Registry of notification handlers
@@ -21,21 +21,42 @@ NOTIFIERS: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
     "websocket": notify_websocket,
 }
 
-# Global rate limit manager
-_rate_limit_manager: Optional[RateLimitManager] = None
+
+def _error(notification_type: str, message: str) -> Dict[str, Any]:
+    """Build a standardized failure response."""
+    return {
+        "success": False,
+        "type": notification_type,
+        "timestamp": now_iso(),
+        "error": message
+    }
+
+
+# (config generation, manager built from that config)
+_rate_limit_manager: Optional[Tuple[int, RateLimitManager]] = None
 
 
 def get_rate_limit_manager() -> RateLimitManager:
-    """Get or create the global rate limit manager."""
+    """
+    Get the rate limit manager for the current config.
+    
+    The manager (and its buckets) is reused until a config file changes,
+    reset_env_cache() picks up new environment variables, or
+    clear_config_cache() is called.
+    """
     global _rate_limit_manager
     
-    if _rate_limit_manager is None:
-        config_data = load_config()
-        use_redis = config_data.get("use_redis_rate_limit", False)
-        rate_limit_config = RateLimitConfig(config_data)
-        _rate_limit_manager = RateLimitManager(rate_limit_config, use_redis)
+    cached = _rate_limit_manager
+    # Stats the config files, so edits are noticed without a cache clear
+    if cached is not None and cached[0] == config_generation():
+        return cached[1]
     
-    return _rate_limit_manager
+    config_data = load_config()
+    use_redis = config_data.get("use_redis_rate_limit", False)
+    manager = RateLimitManager(RateLimitConfig(config_data), use_redis)
+    # Read after loading, which itself bumps the generation on a reload
+    _rate_limit_manager = (config_generation(), manager)
+    return manager
 
 
 def notify(data: Dict[str, Any]) -> Dict[str, Any]:
@@ -49,37 +70,18 @@ def notify(data: Dict[str, Any]) -> Dict[str, Any]:
         Standardized response with success, type, timestamp, and details
     """
     if not isinstance(data, dict):
-        return {
-            "success": False,
-            "type": "unknown",
-            "timestamp": datetime.datetime.utcnow().isoformat() + "Z",
-            "error": "Invalid input: data must be a dictionary"
-        }
+        return _error("unknown", "Invalid input: data must be a dictionary")
     
     notification_type = data.get("type")
     if not notification_type:
-        return {
-            "success": False,
-            "type": "unknown",
-            "timestamp": datetime.datetime.utcnow().isoformat() + "Z",
-            "error": "Missing required field: type"
-        }
+        return _error("unknown", "Missing required field: type")
     
-    if notification_type not in NOTIFIERS:
-        return {
-            "success": False,
-            "type": notification_type,
-            "timestamp": datetime.datetime.utcnow().isoformat() + "Z",
-            "error": f"Unsupported notification type: {notification_type}"
-        }
+    notifier = NOTIFIERS.get(notification_type)
+    if notifier is None:
+        return _error(notification_type, f"Unsupported notification type: {notification_type}")
     
     if "body" not in data:
-        return {
-            "success": False,
-            "type": notification_type,
-            "timestamp": datetime.datetime.utcnow().isoformat() + "Z",
-            "error": "Missing required field: body"
-        }
+        return _error(notification_type, "Missing required field: body")
     
     # Check rate limits
     rate_limiter = get_rate_limit_manager()
@@ -87,7 +89,6 @@ def notify(data: Dict[str, Any]) -> Dict[str, Any]:
         return rate_limiter.get_rate_limit_error(notification_type)
     
     try:
-        notifier = NOTIFIERS[notification_type]
         result = notifier(data)
         
         # Ensure result has required fields
@@ -96,7 +97,7 @@ def notify(data: Dict[str, Any]) -> Dict[str, Any]:
         
         # Add timestamp if not present
         if "timestamp" not in result:
-            result["timestamp"] = datetime.datetime.utcnow().isoformat() + "Z"
+            result["timestamp"] = now_iso()
         
         # Ensure type is set
         if "type" not in result:
@@ -105,9 +106,4 @@ def notify(data: Dict[str, Any]) -> Dict[str, Any]:
         return result
         
     except Exception as e:
-        return {
-            "success": False,
-            "type": notification_type,
-            "timestamp": datetime.datetime.utcnow().isoformat() + "Z",
-            "error": f"Notification failed: {str(e)}"
-        } 
\ No newline at end of file
+        return _error(notification_type, f"Notification failed: {str(e)}") 
\ No newline at end of file
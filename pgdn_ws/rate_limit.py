@@ -2,30 +2,61 @@
 Rate limiting functionality for pgdn-notify.
 """
 
+import hashlib
+import sys
 import time
 import threading
-from typing import Dict, Any, Optional, Union
-from collections import defaultdict
-import datetime
+import uuid
+from typing import Dict, Any, List, NamedTuple, Optional, Sequence, Tuple
+from collections import OrderedDict
 import os
 
 try:
     import redis
+    from redis.exceptions import NoScriptError
     REDIS_AVAILABLE = True
 except ImportError:
     REDIS_AVAILABLE = False
 
+from ._time import now_iso
+
+# Monotonic, so NTP adjustments can't drain or overfill buckets. Looked up
+# at call time so tests can patch it.
+_now_ns = time.monotonic_ns
+
+
+# Static part of the response returned for a blocked notification
+_ERROR_TEMPLATE = {"success": False, "error": "Rate limit exceeded"}
+
 
 class RateLimitExceeded(Exception):
     """Raised when rate limit is exceeded."""
     pass
 
 
+class RateLimit(NamedTuple):
+    """A configured limit: at most `calls` per `period` seconds."""
+    calls: int
+    period: int
+
+
 class InMemoryRateLimiter:
     """In-memory token bucket rate limiter."""
     
-    def __init__(self):
-        self._buckets: Dict[str, Dict[str, Union[int, float]]] = defaultdict(dict)
+    __slots__ = ("_buckets", "_max_keys", "_lock")
+    
+    def __init__(self, max_keys: int = 16384):
+        """
+        Args:
+            max_keys: Number of keys tracked; the least recently used key is
+                forgotten (and starts over with a full bucket) beyond this.
+        """
+        # key -> (tokens, last refill ns), least recently used first. Tokens
+        # are scaled by the period in ns, so a refill is the exact integer
+        # elapsed_ns * max_calls and one call costs period_ns.
+        self._buckets: "OrderedDict[str, Tuple[int, int]]" = OrderedDict()
+        self._max_keys = max_keys
+        # One lock for the whole LRU: eviction touches other keys' entries
         self._lock = threading.Lock()
     
     def is_allowed(self, key: str, max_calls: int, period: int) -> bool:
@@ -41,53 +72,134 @@ class InMemoryRateLimiter:
             True if request is allowed, False otherwise
         """
         with self._lock:
-            now = time.time()
-            bucket = self._buckets[key]
+            now = _now_ns()
+            period_ns = period * 1_000_000_000
+            buckets = self._buckets
+            # Popping and re-inserting moves the key to the most recently
+            # used end
+            bucket = buckets.pop(key, None)
             
-            # Initialize bucket if it doesn't exist
-            if 'tokens' not in bucket:
-                bucket['tokens'] = max_calls
-                bucket['last_refill'] = now
-                bucket['tokens'] -= 1
+            # New bucket starts full, minus this call
+            if bucket is None:
+                if len(buckets) >= self._max_keys:
+                    buckets.popitem(last=False)
+                buckets[key] = ((max_calls - 1) * period_ns, now)
                 return True
             
-            # Calculate tokens to add based on elapsed time
-            elapsed = now - bucket['last_refill']
-            tokens_to_add = elapsed * (max_calls / period)
-            bucket['tokens'] = min(max_calls, bucket['tokens'] + tokens_to_add)
-            bucket['last_refill'] = now
+            # Refill based on elapsed time
+            tokens, last_refill = bucket
+            tokens = min(max_calls * period_ns, tokens + (now - last_refill) * max_calls)
             
             # Check if we have tokens available
-            if bucket['tokens'] >= 1:
-                bucket['tokens'] -= 1
+            if tokens >= period_ns:
+                buckets[key] = (tokens - period_ns, now)
                 return True
             
+            buckets[key] = (tokens, now)
             return False
+    
+    def are_allowed(self, checks: Sequence[Tuple[str, int, int]]) -> List[bool]:
+        """Check several (key, max_calls, period) limits at once."""
+        return [self.is_allowed(key, max_calls, period) for key, max_calls, period in checks]
+
+
+# Sliding window check in one round trip. Only allowed calls are recorded,
+# so a client that keeps hitting the limit doesn't extend its own window.
+# KEYS[1] = bucket key, ARGV = now, period, max_calls, unique member
+# Returns {allowed, calls in the window including this one if allowed}
+_SLIDING_WINDOW_SCRIPT = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+redis.call('ZREMRANGEBYSCORE', key, 0, now - period)
+local count = redis.call('ZCARD', key)
+if count < tonumber(ARGV[3]) then
+    redis.call('ZADD', key, now, ARGV[4])
+    redis.call('EXPIRE', key, period)
+    return {1, count + 1}
+end
+return {0, count}
+"""
+# EVALSHA runs the script by this digest, so it is only sent in full
+# when Redis doesn't have it cached yet
+_SLIDING_WINDOW_SHA = hashlib.sha1(_SLIDING_WINDOW_SCRIPT.encode()).hexdigest()
+
+
+# Connection pool shared by every RedisRateLimiter built without a client,
+# created on first use
+_DEFAULT_POOL: Optional[Any] = None
+_DEFAULT_POOL_LOCK = threading.Lock()
+
+
+def _get_default_pool(max_connections: int) -> Any:
+    """Return the shared pool, configured from REDIS_* environment variables."""
+    global _DEFAULT_POOL
+    with _DEFAULT_POOL_LOCK:
+        if _DEFAULT_POOL is None:
+            # Blocking, so a burst waits briefly for a free connection
+            # instead of opening sockets without bound
+            _DEFAULT_POOL = redis.BlockingConnectionPool(
+                host=os.getenv("REDIS_HOST", "localhost"),
+                port=int(os.getenv("REDIS_PORT", "6379")),
+                db=int(os.getenv("REDIS_DB", "0")),
+                password=os.getenv("REDIS_PASSWORD"),
+                decode_responses=True,
+                max_connections=max_connections,
+                timeout=1
+            )
+        return _DEFAULT_POOL
 
 
 class RedisRateLimiter:
-    """Redis-backed rate limiter using sliding window."""
+    """
+    Redis-backed rate limiter using sliding window.
+    
+    A denied key is remembered in process for a tenth of its period, and
+    checks for it are refused without a Redis call until then. This keeps
+    a burst against an exhausted limit off Redis, at the cost of possibly
+    refusing a call the window would already have allowed.
+    
+    After a Redis error every check is allowed without contacting Redis
+    for one second, so an outage doesn't add a connect timeout to each
+    notification.
+    """
+    
+    # Share of the period a deny is cached for, and number of keys cached
+    _DENY_FRACTION = 0.1
+    _DENY_MAX_KEYS = 4096
+    # How long Redis is skipped after an error
+    _BREAKER_NS = 1_000_000_000
+    
+    __slots__ = ("redis_client", "_denied", "_breaker_until")
     
-    def __init__(self, redis_client: Optional[Any] = None):
+    def __init__(
+        self,
+        redis_client: Optional[Any] = None,
+        *,
+        pool: Optional[Any] = None,
+        max_connections: int = 100
+    ):
+        """
+        Args:
+            redis_client: Client to use as is
+            pool: Connection pool to build a client on, if no client is given
+            max_connections: Size of the shared default pool, used when
+                neither is given; only the first limiter's value applies
+        """
         if not REDIS_AVAILABLE:
             raise ImportError("Redis not available. Install with: pip install redis")
         
-        if redis_client is None:
-            # Create default Redis client
-            redis_host = os.getenv("REDIS_HOST", "localhost")
-            redis_port = int(os.getenv("REDIS_PORT", "6379"))
-            redis_db = int(os.getenv("REDIS_DB", "0"))
-            redis_password = os.getenv("REDIS_PASSWORD")
-            
+        if redis_client is not None:
+            self.redis_client = redis_client
+        else:
             self.redis_client = redis.Redis(
-                host=redis_host,
-                port=redis_port,
-                db=redis_db,
-                password=redis_password,
-                decode_responses=True
+                connection_pool=pool or _get_default_pool(max_connections)
             )
-        else:
-            self.redis_client = redis_client
+        
+        # key -> _now_ns() until which checks are refused without Redis
+        self._denied: Dict[str, int] = {}
+        # _now_ns() until which Redis is assumed down
+        self._breaker_until = 0
     
     def is_allowed(self, key: str, max_calls: int, period: int) -> bool:
         """
@@ -101,36 +213,95 @@ class RedisRateLimiter:
         Returns:
             True if request is allowed, False otherwise
         """
+        if self._is_denied(key):
+            return False
+        if _now_ns() < self._breaker_until:
+            return True
+        
+        # A unique member, so calls landing on the same timestamp all count
+        args = (time.time(), period, max_calls, uuid.uuid4().hex)
         try:
-            pipe = self.redis_client.pipeline()
-            now = time.time()
-            window_start = now - period
-            
-            # Remove old entries
-            pipe.zremrangebyscore(key, 0, window_start)
-            
-            # Count current entries
-            pipe.zcard(key)
-            
-            # Add current request
-            pipe.zadd(key, {str(now): now})
-            
-            # Set expiration
-            pipe.expire(key, period)
-            
-            results = pipe.execute()
-            current_count = results[1]  # Count after removing old entries
-            
-            return current_count < max_calls
-            
+            allowed = bool(self._run_script(key, args)[0])
         except Exception:
             # If Redis fails, allow the request (fail open)
+            self._trip()
             return True
+        if not allowed:
+            self._deny(key, period)
+        return allowed
+    
+    def are_allowed(self, checks: Sequence[Tuple[str, int, int]]) -> List[bool]:
+        """
+        Check several (key, max_calls, period) limits in one Redis round trip.
+        
+        Each check runs the same script as is_allowed(), queued on a single
+        non-transactional pipeline. Fails open as a whole if Redis errors.
+        """
+        allowed = [not self._is_denied(key) for key, _, _ in checks]
+        pending = [i for i, ok in enumerate(allowed) if ok]
+        if not pending or _now_ns() < self._breaker_until:
+            return allowed
+        
+        now = time.time()
+        args = []
+        for i in pending:
+            key, max_calls, period = checks[i]
+            args.append((key, (now, period, max_calls, uuid.uuid4().hex)))
+        try:
+            try:
+                results = self._run_pipeline(args)
+            except NoScriptError:
+                # No check ran, so retrying can't double count
+                self.redis_client.script_load(_SLIDING_WINDOW_SCRIPT)
+                results = self._run_pipeline(args)
+        except Exception:
+            self._trip()
+            return allowed
+        
+        for i, result in zip(pending, results):
+            if not result[0]:
+                allowed[i] = False
+                self._deny(checks[i][0], checks[i][2])
+        return allowed
+    
+    def _trip(self):
+        """Skip Redis for a while after an error."""
+        self._breaker_until = _now_ns() + self._BREAKER_NS
+    
+    def _is_denied(self, key: str) -> bool:
+        """Whether a recent deny for key is still cached."""
+        return _now_ns() < self._denied.get(key, 0)
+    
+    def _deny(self, key: str, period: int):
+        """Cache a deny for key for a fraction of its period."""
+        denied = self._denied
+        if len(denied) >= self._DENY_MAX_KEYS and key not in denied:
+            # Stale entries are harmless but unbounded; start over
+            denied.clear()
+        denied[key] = _now_ns() + int(period * 1_000_000_000 * self._DENY_FRACTION)
+    
+    def _run_pipeline(self, args: list) -> list:
+        """Queue one script call per (key, args) pair and execute them together."""
+        pipe = self.redis_client.pipeline(transaction=False)
+        for key, script_args in args:
+            pipe.evalsha(_SLIDING_WINDOW_SHA, 1, key, *script_args)
+        return pipe.execute()
+    
+    def _run_script(self, key: str, args: tuple) -> list:
+        """Run the sliding window script by SHA, loading it if Redis doesn't have it."""
+        try:
+            return self.redis_client.evalsha(_SLIDING_WINDOW_SHA, 1, key, *args)
+        except NoScriptError:
+            # First use, or the script cache was flushed / Redis restarted
+            self.redis_client.script_load(_SLIDING_WINDOW_SCRIPT)
+            return self.redis_client.evalsha(_SLIDING_WINDOW_SHA, 1, key, *args)
 
 
 class RateLimitConfig:
     """Configuration for rate limits."""
     
+    __slots__ = ("limits", "enabled")
+    
     def __init__(self, config_data: Optional[Dict[str, Any]] = None):
         """
         Initialize rate limit configuration.
@@ -138,7 +309,7 @@ class RateLimitConfig:
         Args:
             config_data: Dictionary containing rate limit settings
         """
-        self.limits: Dict[str, Dict[str, int]] = {}
+        self.limits: Dict[str, RateLimit] = {}
         self.enabled = False
         
         if config_data:
@@ -149,14 +320,24 @@ class RateLimitConfig:
         rate_limits = config_data.get("rate_limits", {})
         
         for notification_type, limits in rate_limits.items():
-            if isinstance(limits, dict) and "calls" in limits and "period" in limits:
-                self.limits[notification_type] = {
-                    "calls": int(limits["calls"]),
-                    "period": int(limits["period"])
-                }
+            limit = self._validate(limits)
+            if limit is not None:
+                self.limits[notification_type] = limit
                 self.enabled = True
     
-    def get_limit(self, notification_type: str) -> Optional[Dict[str, int]]:
+    @staticmethod
+    def _validate(limits: Any) -> Optional[RateLimit]:
+        """Parse one rate limit entry, or return None if it's unusable."""
+        if not isinstance(limits, dict) or "calls" not in limits or "period" not in limits:
+            return None
+        try:
+            limit = RateLimit(int(limits["calls"]), int(limits["period"]))
+        except (TypeError, ValueError):
+            return None
+        # A zero period would divide by zero when refilling
+        return limit if limit.period > 0 else None
+    
+    def get_limit(self, notification_type: str) -> Optional[RateLimit]:
         """Get rate limit for a notification type."""
         return self.limits.get(notification_type)
     
@@ -168,6 +349,8 @@ class RateLimitConfig:
 class RateLimitManager:
     """Manages rate limiting for notifications."""
     
+    __slots__ = ("config", "use_redis", "limiter", "_checks")
+    
     def __init__(self, config: Optional[RateLimitConfig] = None, use_redis: bool = False):
         """
         Initialize rate limit manager.
@@ -183,6 +366,13 @@ class RateLimitManager:
             self.limiter = RedisRateLimiter()
         else:
             self.limiter = InMemoryRateLimiter()
+        
+        # type -> (limiter key, calls, period), so a check doesn't build and
+        # hash a fresh key string each time
+        self._checks: Dict[str, Tuple[str, int, int]] = {
+            notification_type: (sys.intern(f"pgdn_ws_{notification_type}"), calls, period)
+            for notification_type, (calls, period) in self.config.limits.items()
+        }
     
     def check_rate_limit(self, notification_type: str) -> bool:
         """
@@ -194,24 +384,33 @@ class RateLimitManager:
         Returns:
             True if allowed, False if rate limited
         """
-        if not self.config.enabled or not self.config.has_limit(notification_type):
+        check = self._checks.get(notification_type)
+        if check is None:
             return True
+        return self.limiter.is_allowed(*check)
+    
+    def check_rate_limits(self, notification_types: Sequence[str]) -> Dict[str, bool]:
+        """
+        Check rate limits for several notification types at once.
         
-        limit_config = self.config.get_limit(notification_type)
-        if not limit_config:
-            return True
+        With the Redis backend all limited types are checked in a single
+        round trip, which matters when one notification fans out to several
+        channels.
+        
+        Args:
+            notification_types: Types of notification (slack, email, etc.)
+            
+        Returns:
+            Mapping of each type to True if allowed, False if rate limited
+        """
+        allowed = dict.fromkeys(notification_types, True)
+        limited = [t for t in allowed if t in self._checks]
+        checks = [self._checks[t] for t in limited]
         
-        return self.limiter.is_allowed(
-            key=f"pgdn_ws_{notification_type}",
-            max_calls=limit_config["calls"],
-            period=limit_config["period"]
-        )
+        if checks:
+            allowed.update(zip(limited, self.limiter.are_allowed(checks)))
+        return allowed
     
     def get_rate_limit_error(self, notification_type: str) -> Dict[str, Any]:
         """Generate standardized rate limit error response."""
-        return {
-            "success": False,
-            "type": notification_type,
-            "timestamp": datetime.datetime.utcnow().isoformat() + "Z",
-            "error": "Rate limit exceeded"
-        } 
\ No newline at end of file
+        return {**_ERROR_TEMPLATE, "type": notification_type, "timestamp": now_iso()} 
\ No newline at end of file
@@ -44,15 +44,28 @@ try:
 except ImportError:
     redis = None
 
+# Refresh many client mappings in one call: KEYS = client keys, ARGV = server_id, ttl
+_HEARTBEAT_SCRIPT = """
+for i = 1, #KEYS do
+    redis.call('SET', KEYS[i], ARGV[1], 'EX', ARGV[2])
+end
+return #KEYS
+"""
+
+# Keys per script call, so one heartbeat never blocks Redis for long
+HEARTBEAT_CHUNK_SIZE = 1000
+
 class RedisSessionTracker:
     def __init__(self, redis_url: str):
         if redis is None:
             raise ImportError("redis-py>=4.2.0 with asyncio support is required. Install with 'pip install redis>=4.2.0'.")
         self.redis_url = redis_url
         self.redis: Optional[redis.Redis] = None
+        self._heartbeat_script = None
 
     async def connect(self):
         self.redis = await redis.from_url(self.redis_url, decode_responses=True)
+        self._heartbeat_script = self.redis.register_script(_HEARTBEAT_SCRIPT)
 
     async def register_client(self, client_id: str, server_id: str, ttl: int = 60):
         """Register a client with a TTL (seconds)."""
@@ -77,8 +90,16 @@ class RedisSessionTracker:
         while True:
             client_ids = get_client_ids()
             if client_ids:
-                pipe = self.redis.pipeline()
-                for client_id in client_ids:
-                    pipe.set(f"ws_client:{client_id}", server_id, ex=ttl)
-                await pipe.execute()
-            await asyncio.sleep(interval) 
\ No newline at end of file
+                await self.refresh_clients(client_ids, server_id, ttl)
+            await asyncio.sleep(interval)
+
+    async def refresh_clients(self, client_ids: List[str], server_id: str, ttl: int = 60):
+        """Set the mapping and TTL for many clients, HEARTBEAT_CHUNK_SIZE keys per script call."""
+        if self._heartbeat_script is None:
+            raise RuntimeError("RedisSessionTracker.connect() must be awaited before refreshing clients")
+        if not client_ids:
+            return
+        keys = [f"ws_client:{client_id}" for client_id in client_ids]
+        args = [server_id, ttl]
+        for start in range(0, len(keys), HEARTBEAT_CHUNK_SIZE):
+            await self._heartbeat_script(keys=keys[start:start + HEARTBEAT_CHUNK_SIZE], args=args)
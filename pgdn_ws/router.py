@@ -1,33 +1,50 @@
 # pgdn_ws/router.py
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query, status
-from typing import Optional
-import json
+from typing import Optional, Sequence
 import logging
+from . import _json
 from .manager import notification_manager
-from .auth import default_auth_handler
+from .auth import default_auth_handler, cached_auth_handler
 from .types import AuthHandler
 
 logger = logging.getLogger("pgdn-ws")
-logger.setLevel(logging.INFO)
+
+# Constant control frames, encoded once
+INVALID_JSON_ERROR = _json.dumps({"type": "error", "message": "Invalid JSON"})
 
 def create_websocket_router(
     auth_handler: Optional[AuthHandler] = None,
-    path: str = "/ws"
+    path: str = "/ws",
+    auth_cache_ttl: Optional[float] = None,
+    required_fields: Sequence[str] = ("user_id",)
 ) -> APIRouter:
-    """Create a WebSocket router with authentication"""
+    """
+    Create a WebSocket router with authentication
+    
+    Set auth_cache_ttl to reuse auth results for that many seconds per
+    token (see cached_auth_handler); by default every connection is
+    verified.
+    
+    required_fields lists the user info keys that must be non-empty for a
+    connection to be accepted. user_id is always required.
+    """
     
     router = APIRouter()
     auth_fn = auth_handler or default_auth_handler
+    if auth_cache_ttl:
+        auth_fn = cached_auth_handler(auth_fn, ttl=auth_cache_ttl)
+    # user_id gets its own check below, so the common case adds no work
+    extra_fields = tuple(f for f in required_fields if f != "user_id")
     
     @router.websocket(path)
     async def websocket_endpoint(
         websocket: WebSocket,
         token: Optional[str] = Query(None)
     ):
-        logger.info(f"WebSocket connection attempt with token: {token}")
+        logger.info("WebSocket connection attempt with token: %s", token)
         
         # Authenticate
-        user_info = None
+        user_id = None
         try:
             if not token:
                 logger.warning("No token provided")
@@ -47,38 +64,52 @@ def create_websocket_router(
                 await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Invalid user info")
                 return
             
-            logger.info(f"Auth result: {user_id}")
+            if extra_fields and not all(user_info.get(f) for f in extra_fields):
+                logger.warning("Auth succeeded but required user info is missing")
+                await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Invalid user info")
+                return
+            
+            logger.info("Auth result: %s", user_id)
             
             # Connect
-            logger.info(f"Connecting user: {user_id}")
+            logger.info("Connecting user: %s", user_id)
             await notification_manager.connect(websocket, user_info)
             
             # Handle messages
+            receive_text = websocket.receive_text
+            handle_message = notification_manager.handle_message
+            # Error replies share the connection's writer, so they stay in
+            # order with everything else sent to this socket
+            enqueue = notification_manager._enqueue
             while True:
                 try:
-                    data = await websocket.receive_text()
-                    logger.info(f"Received message: {data}")
-                    message = json.loads(data)
-                    await notification_manager.handle_message(websocket, message)
+                    data = await receive_text()
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("Received message: %s", data)
+                    # Only JSON objects are valid messages; reject anything
+                    # else without running the parser
+                    if data[:1] != "{" and not data.lstrip().startswith("{"):
+                        logger.error("Invalid JSON received")
+                        enqueue(websocket, INVALID_JSON_ERROR)
+                        continue
+                    message = _json.loads(data)
+                    await handle_message(websocket, message)
                     
                 except WebSocketDisconnect:
                     logger.info("WebSocket disconnected normally")
                     break
-                except json.JSONDecodeError:
+                except _json.JSONDecodeError:
                     logger.error("Invalid JSON received")
-                    await websocket.send_json({
-                        "type": "error",
-                        "message": "Invalid JSON"
-                    })
+                    enqueue(websocket, INVALID_JSON_ERROR)
                 except Exception as e:
-                    logger.error(f"WebSocket error: {e}", exc_info=True)
+                    logger.error("WebSocket error: %s", e, exc_info=True)
                     break
                     
         except Exception as e:
-            logger.error(f"WebSocket connection error: {e}", exc_info=True)
+            logger.error("WebSocket connection error: %s", e, exc_info=True)
         finally:
-            if user_info and user_info.get('user_id'):
-                logger.info(f"Cleaning up connection for user: {user_info.get('user_id')}")
+            if user_id:
+                logger.info("Cleaning up connection for user: %s", user_id)
             notification_manager.disconnect(websocket)
     
     return router
@@ -1,8 +1,34 @@
 # pgdn_ws/types.py
-from typing import Dict, Any, Optional, List, Callable, Awaitable
+from typing import Dict, Any, Iterator, Optional, List, Callable, Awaitable, NotRequired, TypedDict
 from pydantic import BaseModel, Field
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime, UTC
 from enum import Enum
+from . import _json
+
+_frozen_now: ContextVar[Optional[datetime]] = ContextVar("pgdn_ws_frozen_now", default=None)
+
+def _now() -> datetime:
+    """Current UTC time, or the time fixed by an enclosing freeze_now()"""
+    frozen = _frozen_now.get()
+    return frozen if frozen is not None else datetime.now(UTC)
+
+@contextmanager
+def freeze_now(at: Optional[datetime] = None) -> Iterator[datetime]:
+    """
+    Give every message created inside the block the same timestamp
+
+    Useful when one logical event is sent as many messages, e.g. a
+    per-user loop, so they share one datetime instead of each reading
+    the clock. Scoped to the current task/thread via a context variable.
+    """
+    at = at or datetime.now(UTC)
+    token = _frozen_now.set(at)
+    try:
+        yield at
+    finally:
+        _frozen_now.reset(token)
 
 class MessageType(str, Enum):
     # System messages
@@ -23,17 +49,14 @@ class MessageType(str, Enum):
 class NotificationMessage(BaseModel):
     type: str
     payload: Dict[str, Any]
-    timestamp: datetime = Field(default_factory=lambda: datetime.now(UTC))
+    timestamp: datetime = Field(default_factory=_now)
     user_id: Optional[str] = None
     group_ids: Optional[List[str]] = None
     
     def dict(self, **kwargs):
         """Override dict to handle datetime serialization"""
-        data = self.model_dump(**kwargs)
-        # Convert datetime to ISO format string
-        if isinstance(data.get('timestamp'), datetime):
-            data['timestamp'] = data['timestamp'].isoformat()
-        return data
+        # model_dump already converts the timestamp
+        return self.model_dump(**kwargs)
     
     def model_dump(self, **kwargs):
         """Pydantic v2 method"""
@@ -42,7 +65,26 @@ class NotificationMessage(BaseModel):
         if isinstance(data.get('timestamp'), datetime):
             data['timestamp'] = data['timestamp'].isoformat()
         return data
+    
+    def to_json(self) -> str:
+        """Serialize to a compact JSON string, same shape as model_dump()"""
+        if type(self) is NotificationMessage:
+            # Field values live in the instance __dict__; encoding that
+            # directly skips the model_dump() copy and timestamp fix-up.
+            # Payloads the encoder can't handle (e.g. nested models) fall
+            # through to model_dump below. Subclasses always take that
+            # path so their overrides apply.
+            try:
+                return _json.dumps(self.__dict__)
+            except TypeError:
+                pass
+        return _json.dumps(self.model_dump())
+
+class UserInfo(TypedDict):
+    """What an auth handler returns for a valid token; extra keys are kept"""
+    user_id: str
+    groups: NotRequired[List[str]]
 
 # Type aliases
-AuthHandler = Callable[[str], Awaitable[Optional[Dict[str, Any]]]]
+AuthHandler = Callable[[str], Awaitable[Optional[UserInfo]]]
 MessageHandler = Callable[[Dict[str, Any], str], Awaitable[None]]
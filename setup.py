@@ -28,13 +28,18 @@ setup(
     python_requires=">=3.8",
     install_requires=[
         "fastapi>=0.68.0",
-        "websockets>=10.0",
+        "websockets>=12.0",
         "pydantic>=1.8.0",
     ],
     extras_require={
+        "speedups": [
+            "orjson>=3.6.0",
+            "uvloop>=0.17.0; sys_platform != 'win32'",
+            "httptools>=0.5.0",
+        ],
         "dev": [
             "pytest>=7.0.0",
-            "pytest-asyncio>=0.18.0",
+            "pytest-asyncio>=1.0.0",
             "black>=22.0.0",
             "flake8>=4.0.0",
             "mypy>=0.950",
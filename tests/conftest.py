@@ -0,0 +1,23 @@
+import asyncio
+import pytest
+
+try:
+    import uvloop
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    UVLOOP_AVAILABLE = False
+
+# Run async tests on uvloop when the speedups extra is installed, the same
+# loop production deployments are expected to use
+if UVLOOP_AVAILABLE:
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
+
+@pytest.fixture
+def reset_rate_limiter():
+    """Give the test a rate limit manager with fresh buckets."""
+    from pgdn_ws.config import clear_config_cache
+    # Clearing the config cache makes notify rebuild its manager
+    clear_config_cache()
+    yield
+    clear_config_cache()
@@ -0,0 +1,98 @@
+"""
+Tests for auth handler helpers.
+"""
+
+from unittest.mock import patch
+from pgdn_ws.auth import cached_auth_handler, default_auth_handler
+
+
+def make_counting_handler(result):
+    calls = []
+
+    async def handler(token):
+        calls.append(token)
+        return result
+
+    return handler, calls
+
+
+class TestCachedAuthHandler:
+    """Test caching of auth handler results."""
+    
+    async def test_cached_auth_handler_reuses_result(self):
+        """Test that a repeated token only hits the inner handler once"""
+        inner, calls = make_counting_handler({"user_id": "user-1"})
+        handler = cached_auth_handler(inner)
+
+        assert await handler("token-a") == {"user_id": "user-1"}
+        assert await handler("token-a") == {"user_id": "user-1"}
+        assert calls == ["token-a"]
+
+        await handler("token-b")
+        assert calls == ["token-a", "token-b"]
+    
+    async def test_cached_auth_handler_expires_entries(self):
+        """Test that entries are re-validated after the TTL"""
+        inner, calls = make_counting_handler({"user_id": "user-1"})
+        handler = cached_auth_handler(inner, ttl=10)
+
+        with patch("pgdn_ws._cache.time.monotonic", return_value=1000.0):
+            await handler("token-a")
+        with patch("pgdn_ws._cache.time.monotonic", return_value=1009.0):
+            await handler("token-a")
+        assert len(calls) == 1
+
+        with patch("pgdn_ws._cache.time.monotonic", return_value=1011.0):
+            await handler("token-a")
+        assert len(calls) == 2
+    
+    async def test_cached_auth_handler_clamps_to_exp(self):
+        """Test that a cached result never outlives the token's exp"""
+        inner, calls = make_counting_handler({"user_id": "user-1", "exp": 1_000_005})
+        handler = cached_auth_handler(inner, ttl=60)
+
+        with patch("pgdn_ws.auth.time.time", return_value=1_000_000.0), \
+                patch("pgdn_ws._cache.time.monotonic", return_value=1000.0):
+            await handler("token-a")
+        with patch("pgdn_ws._cache.time.monotonic", return_value=1004.0):
+            await handler("token-a")
+        assert len(calls) == 1
+
+        with patch("pgdn_ws._cache.time.monotonic", return_value=1006.0):
+            await handler("token-a")
+        assert len(calls) == 2
+    
+    async def test_cached_auth_handler_returns_copies(self):
+        """Test that callers can't mutate the cached user info"""
+        inner, _ = make_counting_handler({"user_id": "user-1"})
+        handler = cached_auth_handler(inner)
+
+        first = await handler("token-a")
+        first["groups"] = ["admin"]
+        second = await handler("token-a")
+        second["user_id"] = "someone-else"
+
+        assert await handler("token-a") == {"user_id": "user-1"}
+    
+    async def test_cached_auth_handler_negative_ttl(self):
+        """Test that failed lookups are cached for the shorter negative TTL"""
+        inner, calls = make_counting_handler(None)
+        handler = cached_auth_handler(inner, ttl=10, negative_ttl=2)
+
+        with patch("pgdn_ws._cache.time.monotonic", return_value=1000.0):
+            assert await handler("bad-token") is None
+            assert await handler("bad-token") is None
+        assert len(calls) == 1
+
+        with patch("pgdn_ws._cache.time.monotonic", return_value=1003.0):
+            assert await handler("bad-token") is None
+        assert len(calls) == 2
+    
+    async def test_cached_auth_handler_evicts_lru(self):
+        """Test that the cache stays bounded by maxsize"""
+        handler = cached_auth_handler(default_auth_handler, maxsize=2)
+
+        for token in ("a", "b", "c"):
+            await handler(token)
+
+        assert len(handler.cache) == 2
@@ -73,6 +73,22 @@ class TestSyncMethodCompatibility:
         # Should not raise any exceptions
         assert True
     
+    def test_sync_methods_reuse_background_loop(self):
+        """Test that sync calls share one background event loop."""
+        import asyncio
+        loops = []
+        
+        async def record_loop(frame, exclude_users=None):
+            loops.append(asyncio.get_running_loop())
+        
+        with patch.object(self.manager, 'broadcast_raw', side_effect=record_loop):
+            self.manager.broadcast_raw_sync('{"message": "one"}')
+            self.manager.broadcast_raw_sync('{"message": "two"}')
+        
+        assert len(loops) == 2
+        assert loops[0] is loops[1]
+        assert loops[0].is_running()
+    
     def test_get_stats_thread_safe(self):
         """Test that get_stats is thread-safe."""
         # Call get_stats from multiple threads
@@ -0,0 +1,100 @@
+"""
+Tests for configuration loading.
+"""
+
+import json
+import os
+import pytest
+from unittest.mock import patch
+from pgdn_ws.config import (
+    config_generation,
+    load_config,
+    load_config_from_env,
+    load_config_from_file,
+    reset_env_cache,
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_env_cache():
+    reset_env_cache()
+    yield
+    reset_env_cache()
+
+
+class TestLoadConfigFromEnv:
+    """Test environment variable configuration."""
+
+    def test_reads_rate_limits(self):
+        """Test that rate limits are read from the environment."""
+        env = {
+            "PGDN_NOTIFY_RATE_LIMIT_ENABLED": "true",
+            "PGDN_NOTIFY_RATE_LIMIT_SLACK_CALLS": "5",
+            "PGDN_NOTIFY_RATE_LIMIT_SLACK_PERIOD": "60",
+            "PGDN_NOTIFY_USE_REDIS_RATE_LIMIT": "true",
+        }
+        with patch.dict("os.environ", env):
+            config = load_config_from_env()
+
+        assert config == {
+            "rate_limits": {"slack": {"calls": 5, "period": 60}},
+            "use_redis_rate_limit": True,
+        }
+
+    def test_snapshot_until_reset(self):
+        """Test that environment changes are picked up only after a reset."""
+        with patch.dict("os.environ", {"PGDN_NOTIFY_USE_REDIS_RATE_LIMIT": "false"}):
+            assert load_config_from_env() == {}
+
+        with patch.dict("os.environ", {"PGDN_NOTIFY_USE_REDIS_RATE_LIMIT": "true"}):
+            assert load_config_from_env() == {}
+            reset_env_cache()
+            assert load_config_from_env() == {"use_redis_rate_limit": True}
+
+
+class TestLoadConfig:
+    """Test merged configuration loading."""
+
+    def test_cached_until_file_changes(self, tmp_path):
+        """Test that a config file is re-read only when its mtime changes."""
+        path = tmp_path / "config.json"
+        path.write_text(json.dumps({"use_redis_rate_limit": True}))
+
+        with patch("pgdn_ws.config.load_config_from_file", wraps=load_config_from_file) as loader:
+            assert load_config(str(path)) == {"use_redis_rate_limit": True}
+            assert load_config(str(path)) == {"use_redis_rate_limit": True}
+            assert loader.call_count == 1
+
+            path.write_text(json.dumps({"use_redis_rate_limit": False}))
+            stat = os.stat(path)
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+            assert load_config(str(path)) == {"use_redis_rate_limit": False}
+            assert loader.call_count == 2
+
+    def test_returns_independent_copies(self, tmp_path):
+        """Test that changing a returned config doesn't change the cached one."""
+        path = tmp_path / "config.json"
+        path.write_text(json.dumps({"rate_limits": {"slack": {"calls": 5, "period": 60}}}))
+
+        config = load_config(str(path))
+        config["rate_limits"]["slack"]["calls"] = 1
+        config["rate_limits"]["email"] = {"calls": 1, "period": 60}
+
+        assert load_config(str(path)) == {"rate_limits": {"slack": {"calls": 5, "period": 60}}}
+
+    def test_generation_follows_file_edits(self, tmp_path, monkeypatch):
+        """Test that editing a default config file bumps the generation by itself."""
+        monkeypatch.chdir(tmp_path)
+        path = tmp_path / "pgdn_ws_config.json"
+        path.write_text(json.dumps({"use_redis_rate_limit": True}))
+
+        generation = config_generation()
+        assert config_generation() == generation
+
+        path.write_text(json.dumps({"use_redis_rate_limit": False}))
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+        assert config_generation() != generation
+        assert load_config() == {"use_redis_rate_limit": False}
@@ -0,0 +1,279 @@
+"""
+Tests for NotificationManager fan-out.
+"""
+
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from pgdn_ws import NotificationManager, NotificationClient, NotificationMessage, freeze_now
+from pgdn_ws._pool import MessagePool
+
+
+async def connect(manager, user_id, groups=None):
+    websocket = AsyncMock()
+    await manager.connect(websocket, {"user_id": user_id, "groups": groups or []})
+    await manager.flush()
+    websocket.send_text.reset_mock()
+    return websocket
+
+
+def sent_frames(websocket):
+    return [call.args[0] for call in websocket.send_text.call_args_list]
+
+
+@pytest.fixture
+def manager():
+    """A fresh manager; its sockets are disconnected so no writer task outlives the test."""
+    manager = NotificationManager()
+    yield manager
+    for websocket in list(manager._connection_info):
+        manager.disconnect(websocket)
+
+
+class TestConnections:
+    """Test connecting, disconnecting and the group index."""
+    
+    async def test_connect_sends_confirmation(self, manager):
+        """Test the connection confirmation frame"""
+        websocket = AsyncMock()
+        await manager.connect(websocket, {"user_id": 'user-"1"'})
+        await manager.flush()
+
+        data = json.loads(sent_frames(websocket)[0])
+        assert data["type"] == "connection"
+        assert data["status"] == "connected"
+        assert data["user_id"] == 'user-"1"'
+        assert data["timestamp"].endswith("+00:00")
+    
+    async def test_group_index_follows_connections(self, manager):
+        """Test that the group index is updated on connect and disconnect"""
+        ws1 = await connect(manager, "user-1", groups=["admins", "users"])
+        ws2 = await connect(manager, "user-2", groups=["users"])
+
+        assert manager._group_connections == {"admins": {ws1}, "users": {ws1, ws2}}
+
+        manager.disconnect(ws1)
+        assert manager._group_connections == {"users": {ws2}}
+
+        manager.disconnect(ws2)
+        assert manager._group_connections == {}
+        assert not manager.is_group_connected("users")
+    
+    async def test_broadcast_disconnects_failed_sockets(self, manager):
+        """Test that a failing socket is dropped without stopping the others"""
+        ws1 = await connect(manager, "user-1")
+        ws2 = await connect(manager, "user-2")
+        ws1.send_text.side_effect = RuntimeError("socket closed")
+
+        await manager.broadcast(NotificationMessage(type="info", payload={}))
+        await manager.flush()
+
+        ws2.send_text.assert_called_once()
+        assert manager.get_stats()["users"] == ["user-2"]
+
+
+class TestFanOut:
+    """Test sends to users, groups and everyone."""
+    
+    async def test_send_to_users_sends_same_frame(self, manager):
+        """Test that a multi-user send shares one encoded frame"""
+        ws1 = await connect(manager, "user-1")
+        ws2 = await connect(manager, "user-2")
+
+        message = NotificationMessage(type="info", payload={"message": "hi"})
+        await manager.send_to_users(["user-1", "user-2", "user-3"], message)
+        await manager.flush()
+
+        assert sent_frames(ws1) == sent_frames(ws2)
+        data = json.loads(sent_frames(ws1)[0])
+        assert data["type"] == "info"
+        assert data["payload"] == {"message": "hi"}
+        assert isinstance(data["timestamp"], str)
+    
+    async def test_broadcast_raw_excludes_users(self, manager):
+        """Test that broadcast_raw skips excluded users"""
+        ws1 = await connect(manager, "user-1")
+        ws2 = await connect(manager, "user-2")
+
+        await manager.broadcast_raw('{"type":"info"}', exclude_users=["user-2"])
+        await manager.flush()
+
+        assert sent_frames(ws1) == ['{"type":"info"}']
+        ws2.send_text.assert_not_called()
+
+        # Any iterable works, including a prebuilt set
+        await manager.broadcast_raw('{"type":"info"}', exclude_users={"user-1", "user-2"})
+        await manager.flush()
+
+        assert sent_frames(ws1) == ['{"type":"info"}']
+        ws2.send_text.assert_not_called()
+    
+    async def test_client_notify_group(self, manager):
+        """Test that the client reaches only group members"""
+        client = NotificationClient(manager)
+        ws1 = await connect(manager, "user-1", groups=["admins"])
+        ws2 = await connect(manager, "user-2", groups=["users"])
+
+        await client.notify_group("admins", "warning", {"message": "disk full"})
+        await manager.flush()
+
+        assert json.loads(sent_frames(ws1)[0])["group_ids"] == ["admins"]
+        ws2.send_text.assert_not_called()
+    
+    async def test_client_skips_encoding_without_receivers(self, manager):
+        """Test that fan-out with no connected receivers doesn't encode"""
+        client = NotificationClient(manager)
+        manager.encode_message = MagicMock(side_effect=AssertionError("encoded"))
+
+        await client.broadcast("info", {})
+        await client.notify_group("admins", "info", {})
+        await client.notify_users(["user-1", "user-2"], "info", {})
+
+        assert manager.connection_count == 0
+    
+    async def test_sync_call_from_thread_uses_connection_loop(self, manager):
+        """Test that sync sends from another thread reach the loop's sockets"""
+        client = NotificationClient(manager)
+        ws1 = await connect(manager, "user-1")
+
+        await asyncio.to_thread(client.notify_user_sync, "user-1", "info", {"n": 1})
+        await manager.flush()
+
+        assert json.loads(sent_frames(ws1)[0])["payload"] == {"n": 1}
+    
+    async def test_sync_call_inside_loop_does_not_block(self, manager):
+        """Test that sync sends from the owning loop are scheduled"""
+        client = NotificationClient(manager)
+        ws1 = await connect(manager, "user-1")
+
+        client.notify_user_sync("user-1", "info", {"n": 1})
+        await asyncio.sleep(0)
+        await manager.flush()
+
+        assert len(sent_frames(ws1)) == 1
+
+
+class TestOutbox:
+    """Test per-connection queueing and batching."""
+    
+    async def test_batch_mode_coalesces_queued_frames(self, manager):
+        """Test that a batching client gets queued frames as one JSON array"""
+        ws1 = await connect(manager, "user-1")
+        await manager.handle_message(ws1, {"type": "set_batch", "enabled": True})
+
+        await manager.broadcast_raw('{"n":1}')
+        await manager.broadcast_raw('{"n":2}')
+        await manager.flush()
+
+        assert sent_frames(ws1) == ['[{"n":1},{"n":2}]']
+    
+    async def test_full_queue_drops_frames(self, manager):
+        """Test that a full queue drops its oldest frames and counts them"""
+        manager.max_queue_size = 2
+        ws1 = await connect(manager, "user-1")
+
+        for n in range(5):
+            await manager.broadcast_raw(f'{{"n":{n}}}')
+        await manager.flush()
+
+        assert sent_frames(ws1) == ['{"n":3}', '{"n":4}']
+        assert manager.get_stats()["dropped_frames"] == 3
+
+
+class TestHandleMessage:
+    """Test built-in and custom client message handling."""
+    
+    async def test_ping_gets_pong(self, manager):
+        """Test that ping is answered with a pong echoing its timestamp"""
+        ws1 = await connect(manager, "user-1")
+
+        await manager.handle_message(ws1, {"type": "ping", "timestamp": 'now "ish"'})
+        await manager.handle_message(ws1, {"type": "ping"})
+        await manager.flush()
+
+        assert [json.loads(frame) for frame in sent_frames(ws1)] == [
+            {"type": "pong", "timestamp": 'now "ish"'},
+            {"type": "pong", "timestamp": None},
+        ]
+    
+    async def test_custom_batch_handler_still_called(self, manager):
+        """Test that an app's own "batch" handler isn't shadowed by batch mode"""
+        ws1 = await connect(manager, "user-1")
+        handler = AsyncMock()
+        manager.register_handler("batch", handler)
+
+        await manager.handle_message(ws1, {"type": "batch", "items": [1, 2]})
+
+        handler.assert_awaited_once_with({"type": "batch", "items": [1, 2]}, "user-1")
+
+
+class TestEncoding:
+    """Test message encoding and pooled messages."""
+    
+    def test_encode_message_matches_model_dump(self, manager):
+        """Test that the direct encoding path matches model_dump output"""
+        message = NotificationMessage(
+            type="info",
+            payload={"message": "hi", "count": 2},
+            user_id="user-1",
+            group_ids=["admins"]
+        )
+
+        assert json.loads(manager.encode_message(message)) == message.model_dump()
+    
+    def test_to_json_uses_subclass_model_dump(self):
+        """Test that subclasses are encoded through their own model_dump"""
+        class TaggedMessage(NotificationMessage):
+            def model_dump(self, **kwargs):
+                return {**super().model_dump(**kwargs), "tag": "x"}
+
+        message = TaggedMessage(type="info", payload={})
+
+        assert json.loads(message.to_json()) == message.model_dump()
+        assert json.loads(message.to_json())["tag"] == "x"
+    
+    async def test_client_notify_user_pooled_message(self, manager):
+        """Test that pooled messages encode the current call's fields"""
+        client = NotificationClient(manager)
+        ws1 = await connect(manager, "user-1")
+
+        await client.notify_user("user-1", "info", {"n": 1})
+        await client.notify_user("user-1", "success", {"n": 2})
+        await manager.flush()
+
+        first, second = [json.loads(frame) for frame in sent_frames(ws1)]
+        assert (first["type"], first["payload"], first["user_id"]) == ("info", {"n": 1}, "user-1")
+        assert (second["type"], second["payload"]) == ("success", {"n": 2})
+        assert second["group_ids"] is None
+    
+    def test_message_pool_checks_types_on_reuse(self):
+        """Test that a bad payload is rejected the same with and without a pooled shell"""
+        pool = MessagePool()
+
+        with pytest.raises(TypeError):
+            pool.acquire("info", ["not", "a", "dict"])
+        pool.release(pool.acquire("info", {}))
+        with pytest.raises(TypeError):
+            pool.acquire("info", ["not", "a", "dict"])
+        with pytest.raises(TypeError):
+            pool.acquire(1, {})
+
+        message = pool.acquire("info", {"n": 1})
+        assert json.loads(message.to_json())["payload"] == {"n": 1}
+    
+    async def test_freeze_now_shares_timestamp(self, manager):
+        """Test that messages built inside freeze_now share one timestamp"""
+        client = NotificationClient(manager)
+        ws1 = await connect(manager, "user-1")
+        ws2 = await connect(manager, "user-2")
+
+        with freeze_now() as at:
+            await client.notify_user("user-1", "info", {"n": 1})
+            await client.notify_user("user-2", "info", {"n": 2})
+            assert NotificationMessage(type="info", payload={}).timestamp is at
+        await manager.flush()
+
+        timestamps = {json.loads(sent_frames(ws)[0])["timestamp"] for ws in (ws1, ws2)}
+        assert timestamps == {at.isoformat()}
+        assert NotificationMessage(type="info", payload={}).timestamp != at
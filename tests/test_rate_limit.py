@@ -2,6 +2,8 @@
 Tests for rate limiting functionality.
 """
 
+import hashlib
+import threading
 import time
 import pytest
 from unittest.mock import patch, MagicMock
@@ -9,7 +11,9 @@ from pgdn_ws.rate_limit import (
     InMemoryRateLimiter, 
     RedisRateLimiter, 
     RateLimitConfig, 
-    RateLimitManager
+    RateLimitManager,
+    _SLIDING_WINDOW_SCRIPT,
+    _SLIDING_WINDOW_SHA
 )
 from pgdn_ws import notify
 
@@ -51,9 +55,9 @@ class TestInMemoryRateLimiter:
         assert limiter.is_allowed("test", 5, 60) is False
         
         # Mock time to simulate passage of time
-        with patch('time.time') as mock_time:
+        with patch('pgdn_ws.rate_limit._now_ns') as mock_now:
             # Simulate 30 seconds passing (should refill ~2.5 tokens)
-            mock_time.return_value = time.time() + 30
+            mock_now.return_value = time.monotonic_ns() + 30 * 10**9
             
             # Should now allow some requests
             assert limiter.is_allowed("test", 5, 60) is True
@@ -74,6 +78,41 @@ class TestInMemoryRateLimiter:
         
         # key2 should still be allowed
         assert limiter.is_allowed("key2", 5, 60) is True
+    
+    def test_lru_eviction(self):
+        """Test that the least recently used key is evicted at max_keys."""
+        limiter = InMemoryRateLimiter(max_keys=2)
+        
+        limiter.is_allowed("key1", 1, 60)
+        limiter.is_allowed("key2", 1, 60)
+        # Touch key1 so key2 is the least recently used
+        assert limiter.is_allowed("key1", 1, 60) is False
+        limiter.is_allowed("key3", 1, 60)
+        
+        # key1 is still tracked and blocked; key2 was forgotten
+        assert limiter.is_allowed("key1", 1, 60) is False
+        assert limiter.is_allowed("key2", 1, 60) is True
+    
+    def test_max_keys_bound_under_threads(self):
+        """Test that concurrent checks never exceed max_keys or fail."""
+        limiter = InMemoryRateLimiter(max_keys=4)
+        errors = []
+        
+        def worker(n):
+            try:
+                for i in range(2000):
+                    limiter.is_allowed(f"key{n}-{i % 7}", 5, 60)
+            except Exception as e:
+                errors.append(e)
+        
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert errors == []
+        assert len(limiter._buckets) <= 4
 
 
 class TestRedisRateLimiter:
@@ -83,9 +122,7 @@ class TestRedisRateLimiter:
     def test_allows_initial_requests(self, mock_redis_module):
         """Test that initial requests are allowed."""
         mock_redis_client = MagicMock()
-        mock_pipeline = MagicMock()
-        mock_redis_client.pipeline.return_value = mock_pipeline
-        mock_pipeline.execute.return_value = [None, 0, None, None]  # 0 current requests
+        mock_redis_client.evalsha.return_value = [1, 1]  # allowed, first call in window
         
         limiter = RedisRateLimiter(mock_redis_client)
         
@@ -95,9 +132,7 @@ class TestRedisRateLimiter:
     def test_blocks_after_limit(self, mock_redis_module):
         """Test that requests are blocked after limit is reached."""
         mock_redis_client = MagicMock()
-        mock_pipeline = MagicMock()
-        mock_redis_client.pipeline.return_value = mock_pipeline
-        mock_pipeline.execute.return_value = [None, 5, None, None]  # 5 current requests
+        mock_redis_client.evalsha.return_value = [0, 5]  # 5 calls already in window
         
         limiter = RedisRateLimiter(mock_redis_client)
         
@@ -107,12 +142,83 @@ class TestRedisRateLimiter:
     def test_fails_open_on_redis_error(self, mock_redis_module):
         """Test that limiter fails open when Redis is unavailable."""
         mock_redis_client = MagicMock()
-        mock_redis_client.pipeline.side_effect = Exception("Redis connection failed")
+        mock_redis_client.evalsha.side_effect = Exception("Redis connection failed")
         
         limiter = RedisRateLimiter(mock_redis_client)
         
         # Should allow request when Redis fails
         assert limiter.is_allowed("test", 5, 60) is True
+    
+    @patch('pgdn_ws.rate_limit._DEFAULT_POOL', None)
+    @patch('pgdn_ws.rate_limit.redis')
+    def test_shares_default_pool(self, mock_redis_module):
+        """Test that limiters built without a client share one pool."""
+        RedisRateLimiter()
+        RedisRateLimiter()
+        
+        mock_redis_module.BlockingConnectionPool.assert_called_once()
+        pool = mock_redis_module.BlockingConnectionPool.return_value
+        for call in mock_redis_module.Redis.call_args_list:
+            assert call.kwargs == {"connection_pool": pool}
+        assert mock_redis_module.Redis.call_count == 2
+    
+    @patch('pgdn_ws.rate_limit.redis')
+    def test_breaker_skips_redis_during_outage(self, mock_redis_module):
+        """Test that Redis isn't retried for a while after an error."""
+        mock_redis_client = MagicMock()
+        mock_redis_client.evalsha.side_effect = Exception("Redis connection failed")
+        
+        limiter = RedisRateLimiter(mock_redis_client)
+        
+        for _ in range(10):
+            assert limiter.is_allowed("test", 5, 60) is True
+        assert mock_redis_client.evalsha.call_count == 1
+    
+    @patch('pgdn_ws.rate_limit.redis')
+    def test_deny_short_circuits_redis(self, mock_redis_module):
+        """Test that a recent deny is answered without calling Redis."""
+        mock_redis_client = MagicMock()
+        mock_redis_client.evalsha.return_value = [0, 5]
+        
+        limiter = RedisRateLimiter(mock_redis_client)
+        
+        assert limiter.is_allowed("test", 5, 60) is False
+        assert limiter.is_allowed("test", 5, 60) is False
+        assert mock_redis_client.evalsha.call_count == 1
+        
+        # A tenth of the period later Redis is asked again
+        with patch('pgdn_ws.rate_limit._now_ns') as mock_now:
+            mock_now.return_value = time.monotonic_ns() + 6 * 10**9
+            mock_redis_client.evalsha.return_value = [1, 5]
+            assert limiter.is_allowed("test", 5, 60) is True
+        assert mock_redis_client.evalsha.call_count == 2
+    
+    @patch('pgdn_ws.rate_limit.redis')
+    def test_noscript_reload(self, mock_redis_module):
+        """Test that the script is reloaded when Redis has lost it."""
+        from redis.exceptions import NoScriptError
+        
+        mock_redis_client = MagicMock()
+        mock_redis_client.evalsha.side_effect = [NoScriptError("NOSCRIPT"), [1, 1]]
+        
+        limiter = RedisRateLimiter(mock_redis_client)
+        
+        assert limiter.is_allowed("test", 5, 60) is True
+        mock_redis_client.script_load.assert_called_once_with(_SLIDING_WINDOW_SCRIPT)
+        assert mock_redis_client.evalsha.call_args.args[:3] == (_SLIDING_WINDOW_SHA, 1, "test")
+    
+    @patch('pgdn_ws.rate_limit.redis')
+    def test_script_sha_precomputed(self, mock_redis_module):
+        """Test that a cached script is run by SHA without loading it first."""
+        mock_redis_client = MagicMock()
+        mock_redis_client.evalsha.return_value = [1, 1]
+        
+        limiter = RedisRateLimiter(mock_redis_client)
+        
+        assert limiter.is_allowed("test", 5, 60) is True
+        assert _SLIDING_WINDOW_SHA == hashlib.sha1(_SLIDING_WINDOW_SCRIPT.encode()).hexdigest()
+        assert mock_redis_client.evalsha.call_args.args[0] == _SLIDING_WINDOW_SHA
+        mock_redis_client.script_load.assert_not_called()
 
 
 class TestRateLimitConfig:
@@ -143,10 +249,12 @@ class TestRateLimitConfig:
         assert config.has_limit("webhook") is False
         
         slack_limit = config.get_limit("slack")
-        assert slack_limit == {"calls": 10, "period": 60}
+        assert slack_limit == (10, 60)
+        assert slack_limit.calls == 10
+        assert slack_limit.period == 60
         
         email_limit = config.get_limit("email")
-        assert email_limit == {"calls": 50, "period": 3600}
+        assert email_limit == (50, 3600)
     
     def test_invalid_config_ignored(self):
         """Test that invalid config entries are ignored."""
@@ -154,7 +262,9 @@ class TestRateLimitConfig:
             "rate_limits": {
                 "slack": {"calls": 10, "period": 60},
                 "invalid": {"calls": "not_a_number"},
-                "missing_period": {"calls": 10}
+                "missing_period": {"calls": 10},
+                "bad_calls": {"calls": "lots", "period": 60},
+                "zero_period": {"calls": 10, "period": 0}
             }
         }
         
@@ -164,6 +274,8 @@ class TestRateLimitConfig:
         assert config.has_limit("slack") is True
         assert config.has_limit("invalid") is False
         assert config.has_limit("missing_period") is False
+        assert config.has_limit("bad_calls") is False
+        assert config.has_limit("zero_period") is False
 
 
 class TestRateLimitManager:
@@ -198,6 +310,43 @@ class TestRateLimitManager:
         # Should still allow other types
         assert manager.check_rate_limit("email") is True
     
+    def test_check_rate_limits_in_memory(self):
+        """Test batch checks against the in-memory limiter."""
+        config = RateLimitConfig({"rate_limits": {"slack": {"calls": 1, "period": 60}}})
+        manager = RateLimitManager(config)
+        
+        assert manager.check_rate_limits(["slack", "email"]) == {"slack": True, "email": True}
+        assert manager.check_rate_limits(["slack", "email"]) == {"slack": False, "email": True}
+    
+    @patch('pgdn_ws.rate_limit.redis')
+    def test_check_rate_limits_batches_pipeline(self, mock_redis_module):
+        """Test that several limits are checked with one pipeline execute."""
+        mock_redis_client = MagicMock()
+        pipe = mock_redis_client.pipeline.return_value
+        pipe.execute.return_value = [[1, 1], [0, 5]]
+        
+        config = RateLimitConfig({
+            "rate_limits": {
+                "slack": {"calls": 5, "period": 60},
+                "email": {"calls": 5, "period": 60}
+            }
+        })
+        manager = RateLimitManager(config)
+        manager.limiter = RedisRateLimiter(mock_redis_client)
+        
+        result = manager.check_rate_limits(["slack", "email", "webhook"])
+        
+        assert result == {"slack": True, "email": False, "webhook": True}
+        assert pipe.evalsha.call_count == 2
+        assert pipe.execute.call_count == 1
+        mock_redis_client.evalsha.assert_not_called()
+        
+        # The denied type is skipped from the next pipeline
+        pipe.execute.return_value = [[1, 2]]
+        result = manager.check_rate_limits(["slack", "email"])
+        assert result == {"slack": True, "email": False}
+        assert pipe.evalsha.call_count == 3
+    
     def test_rate_limit_error_response(self):
         """Test rate limit error response format."""
         manager = RateLimitManager()
@@ -215,7 +364,7 @@ class TestNotifyWithRateLimit:
     @patch('pgdn_ws.notify.load_config')
     @patch('pgdn_ws.types.slack.requests.post')
     @patch('pgdn_ws.types.slack.os.getenv')
-    def test_rate_limit_blocks_notification(self, mock_getenv, mock_post, mock_load_config):
+    def test_rate_limit_blocks_notification(self, mock_getenv, mock_post, mock_load_config, reset_rate_limiter):
         """Test that rate limiting blocks notifications."""
         # Setup mocks
         mock_load_config.return_value = {
@@ -229,10 +378,6 @@ class TestNotifyWithRateLimit:
         mock_response.raise_for_status.return_value = None
         mock_post.return_value = mock_response
         
-        # Reset rate limiter to pick up new config
-        import pgdn_ws.notify
-        pgdn_ws.notify._rate_limit_manager = None
-        
         data = {
             "type": "slack",
             "body": "test",
@@ -252,14 +397,10 @@ class TestNotifyWithRateLimit:
         assert mock_post.call_count == 1
     
     @patch('pgdn_ws.notify.load_config')
-    def test_no_rate_limit_when_disabled(self, mock_load_config):
+    def test_no_rate_limit_when_disabled(self, mock_load_config, reset_rate_limiter):
         """Test that notifications work normally when rate limiting is disabled."""
         mock_load_config.return_value = {}
         
-        # Reset rate limiter
-        import pgdn_ws.notify
-        pgdn_ws.notify._rate_limit_manager = None
-        
         data = {
             "type": "slack",
             "body": "test",
@@ -0,0 +1,56 @@
+"""
+Tests for Redis session tracking.
+"""
+
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from pgdn_ws.redis_session import HEARTBEAT_CHUNK_SIZE, RedisSessionTracker
+
+
+async def connected_tracker():
+    """Return a tracker connected to a mock client, and its heartbeat script."""
+    client = MagicMock()
+    script = AsyncMock()
+    client.register_script.return_value = script
+    
+    with patch("pgdn_ws.redis_session.redis.from_url", AsyncMock(return_value=client)):
+        tracker = RedisSessionTracker("redis://localhost:6379/0")
+        await tracker.connect()
+    return tracker, script
+
+
+class TestHeartbeat:
+    """Test refreshing client mappings."""
+    
+    async def test_refresh_clients_chunks_script_calls(self):
+        """Test that a heartbeat runs the script once per HEARTBEAT_CHUNK_SIZE keys."""
+        tracker, script = await connected_tracker()
+        
+        client_ids = [f"c{i}" for i in range(2 * HEARTBEAT_CHUNK_SIZE + 500)]
+        await tracker.refresh_clients(client_ids, "server-1", ttl=60)
+        
+        assert HEARTBEAT_CHUNK_SIZE == 1000
+        assert script.await_count == 3
+        for call, start, size in zip(script.await_args_list, (0, 1000, 2000), (1000, 1000, 500)):
+            expected_keys = [f"ws_client:c{i}" for i in range(start, start + size)]
+            assert call.kwargs == {"keys": expected_keys, "args": ["server-1", 60]}
+    
+    async def test_refresh_clients_requires_connect(self):
+        """Test that refreshing before connect() fails with a clear error."""
+        tracker = RedisSessionTracker("redis://localhost:6379/0")
+        
+        with pytest.raises(RuntimeError, match="connect"):
+            await tracker.refresh_clients(["c1"], "server-1")
+    
+    async def test_heartbeat_skips_empty_client_list(self):
+        """Test that a heartbeat with no connected clients makes no Redis calls."""
+        tracker, script = await connected_tracker()
+        
+        for client_ids in ([], None):
+            with patch("pgdn_ws.redis_session.asyncio.sleep", AsyncMock(side_effect=asyncio.CancelledError)):
+                with pytest.raises(asyncio.CancelledError):
+                    await tracker.heartbeat(lambda: client_ids, "server-1")
+        await tracker.refresh_clients([], "server-1")
+        
+        script.assert_not_awaited()
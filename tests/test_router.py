@@ -2,11 +2,33 @@ import pytest
 import asyncio
 from unittest.mock import AsyncMock, MagicMock
 from fastapi.testclient import TestClient
-from fastapi import FastAPI
+from fastapi import FastAPI, WebSocketDisconnect
 from pgdn_ws.router import create_websocket_router
+from pgdn_ws.manager import notification_manager
 from pgdn_ws.auth import default_auth_handler
 
 
+class FakeWS:
+    """Minimal WebSocket stand-in; cheaper than configuring AsyncMocks."""
+    
+    def __init__(self):
+        self.accepted = False
+        self.closed = False
+        self.sent = []
+    
+    async def accept(self):
+        self.accepted = True
+    
+    async def close(self, code=1000, reason=None):
+        self.closed = True
+    
+    async def send_text(self, data):
+        self.sent.append(data)
+    
+    async def receive_text(self):
+        raise RuntimeError("Connection closed")
+
+
 @pytest.fixture
 def app():
     app = FastAPI()
@@ -20,62 +42,48 @@ def client(app):
     return TestClient(app)
 
 
-@pytest.mark.asyncio
 async def test_websocket_auth_success():
     """Test successful WebSocket authentication"""
     router = create_websocket_router()
     
-    # Mock WebSocket
-    websocket = AsyncMock()
-    websocket.close = AsyncMock()
-    websocket.accept = AsyncMock()
-    websocket.receive_text = AsyncMock(side_effect=Exception("Connection closed"))
+    ws = FakeWS()
     
     # Test with valid token
-    await router.routes[0].endpoint(websocket, token="valid-token")
+    await router.routes[0].endpoint(ws, token="valid-token")
     
     # Should accept connection
-    websocket.accept.assert_called_once()
-    websocket.close.assert_not_called()
+    assert ws.accepted
+    assert not ws.closed
 
 
-@pytest.mark.asyncio
 async def test_websocket_auth_failure():
     """Test failed WebSocket authentication"""
     router = create_websocket_router()
     
-    # Mock WebSocket
-    websocket = AsyncMock()
-    websocket.close = AsyncMock()
-    websocket.accept = AsyncMock()
+    ws = FakeWS()
     
     # Test with invalid token
-    await router.routes[0].endpoint(websocket, token="invalid-token")
+    await router.routes[0].endpoint(ws, token="invalid-token")
     
     # Should close connection
-    websocket.close.assert_called_once()
-    websocket.accept.assert_not_called()
+    assert ws.closed
+    assert not ws.accepted
 
 
-@pytest.mark.asyncio
 async def test_websocket_no_token():
     """Test WebSocket connection without token"""
     router = create_websocket_router()
     
-    # Mock WebSocket
-    websocket = AsyncMock()
-    websocket.close = AsyncMock()
-    websocket.accept = AsyncMock()
+    ws = FakeWS()
     
     # Test without token
-    await router.routes[0].endpoint(websocket, token=None)
+    await router.routes[0].endpoint(ws, token=None)
     
     # Should close connection
-    websocket.close.assert_called_once()
-    websocket.accept.assert_not_called()
+    assert ws.closed
+    assert not ws.accepted
 
 
-@pytest.mark.asyncio
 async def test_websocket_auth_returns_none():
     """Test WebSocket authentication when auth handler returns None"""
     async def mock_auth_handler(token):
@@ -83,20 +91,16 @@ async def test_websocket_auth_returns_none():
     
     router = create_websocket_router(auth_handler=mock_auth_handler)
     
-    # Mock WebSocket
-    websocket = AsyncMock()
-    websocket.close = AsyncMock()
-    websocket.accept = AsyncMock()
+    ws = FakeWS()
     
     # Test with any token
-    await router.routes[0].endpoint(websocket, token="any-token")
+    await router.routes[0].endpoint(ws, token="any-token")
     
     # Should close connection
-    websocket.close.assert_called_once()
-    websocket.accept.assert_not_called()
+    assert ws.closed
+    assert not ws.accepted
 
 
-@pytest.mark.asyncio
 async def test_websocket_auth_returns_empty_dict():
     """Test WebSocket authentication when auth handler returns empty dict"""
     async def mock_auth_handler(token):
@@ -104,21 +108,16 @@ async def test_websocket_auth_returns_empty_dict():
     
     router = create_websocket_router(auth_handler=mock_auth_handler)
     
-    # Mock WebSocket
-    websocket = AsyncMock()
-    websocket.close = AsyncMock()
-    websocket.accept = AsyncMock()
-    websocket.receive_text = AsyncMock(side_effect=Exception("Connection closed"))
+    ws = FakeWS()
     
     # Test with any token
-    await router.routes[0].endpoint(websocket, token="any-token")
+    await router.routes[0].endpoint(ws, token="any-token")
     
     # Should close connection due to missing user_id
-    websocket.close.assert_called_once()
-    websocket.accept.assert_not_called()
+    assert ws.closed
+    assert not ws.accepted
 
 
-@pytest.mark.asyncio
 async def test_websocket_auth_returns_dict_without_user_id():
     """Test WebSocket authentication when auth handler returns dict without user_id"""
     async def mock_auth_handler(token):
@@ -126,17 +125,84 @@ async def test_websocket_auth_returns_dict_without_user_id():
     
     router = create_websocket_router(auth_handler=mock_auth_handler)
     
-    # Mock WebSocket
-    websocket = AsyncMock()
-    websocket.close = AsyncMock()
-    websocket.accept = AsyncMock()
+    ws = FakeWS()
     
     # Test with any token
-    await router.routes[0].endpoint(websocket, token="any-token")
+    await router.routes[0].endpoint(ws, token="any-token")
     
     # Should close connection due to missing user_id
-    websocket.close.assert_called_once()
-    websocket.accept.assert_not_called()
+    assert ws.closed
+    assert not ws.accepted
+
+
+async def test_websocket_required_fields():
+    """Test that connections missing a configured required field are closed"""
+    async def mock_auth_handler(token):
+        return {"user_id": "user-1"}
+    
+    router = create_websocket_router(
+        auth_handler=mock_auth_handler,
+        required_fields=("user_id", "groups")
+    )
+    
+    ws = FakeWS()
+    await router.routes[0].endpoint(ws, token="any-token")
+    
+    assert ws.closed
+    assert not ws.accepted
+
+
+async def test_websocket_invalid_json_reply():
+    """Test that non-object frames get an error reply and the loop continues"""
+    router = create_websocket_router()
+    
+    frames = iter([
+        "not json", "5", ' {"type": ', '{"type": "ping"}', WebSocketDisconnect()
+    ])
+    receives = 0
+    
+    async def receive_text():
+        # Replies are queued; let the writer send them before the next
+        # frame so they aren't discarded when the endpoint disconnects
+        nonlocal receives
+        receives += 1
+        await notification_manager.flush()
+        frame = next(frames)
+        if isinstance(frame, Exception):
+            raise frame
+        return frame
+    
+    # Mock WebSocket
+    websocket = AsyncMock()
+    websocket.receive_text = receive_text
+    
+    await router.routes[0].endpoint(websocket, token="valid-token")
+    
+    errors = [
+        call for call in websocket.send_text.call_args_list
+        if call.args[0] == '{"type":"error","message":"Invalid JSON"}'
+    ]
+    assert len(errors) == 3
+    assert receives == 5
+
+
+async def test_websocket_auth_cache_ttl():
+    """Test that auth_cache_ttl reuses the auth result for a repeated token"""
+    calls = []
+    
+    async def mock_auth_handler(token):
+        calls.append(token)
+        return {"user_id": "user-1"}
+    
+    router = create_websocket_router(auth_handler=mock_auth_handler, auth_cache_ttl=30)
+    
+    for _ in range(2):
+        websocket = AsyncMock()
+        websocket.receive_text = AsyncMock(side_effect=WebSocketDisconnect())
+        await router.routes[0].endpoint(websocket, token="token-1")
+        websocket.accept.assert_called_once()
+    
+    assert calls == ["token-1"]
 
 
 def test_logger_name():